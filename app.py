@@ -1,35 +1,123 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-import pandas as pd
-import numpy as np
-import joblib
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 import os
-from utils import login_user, login_patient, get_patients, add_patient as add_patient_data, get_patient_by_id, save_prediction, get_patient_history, get_doctor_search_options, search_doctors
+import numpy as np
+from model_registry import ModelRegistry
+import metrics
+from metrics import stage
+from micro_batcher import MicroBatcher
+from prediction_cache import PredictionCache
+from preprocessing import FIELD_NAMES, row_to_features, rows_to_features
+from explain import top_contributions
+from bulk_io import EXPORT_MIMETYPES
+from drift_monitor import DriftMonitor, MERGE_SECONDS, load_training_stats
+from utils import login_user, login_patient, get_patients_page, get_patient_summary, allocate_patient_id, add_patient as add_patient_data, get_patient_by_id, save_prediction, get_patient_history_page, get_patient_history_summary, get_disease_distribution, get_doctor_search_options, search_doctors, recommend_doctors, import_patients, export_table, EXPORT_TABLES, STATE_DB
 
 app = Flask(__name__)
 app.secret_key = 'super_secret_key_for_hackathon'  # Change this for production
 
+# Request timing for every route; requests slower than MEDIAI_SLOW_REQUEST_MS are logged with their stages
+SLOW_REQUEST_MS = os.environ.get('MEDIAI_SLOW_REQUEST_MS')
+metrics.init_app(app, slow_request_ms=float(SLOW_REQUEST_MS) if SLOW_REQUEST_MS else None)
+
 
 # --- Load Unified Model ---
-unified_model = None
-unified_scaler = None
-unified_encoders = None
+# Inference engine: 'sklearn' (default) or 'compiled' (see fast_forest.py)
+INFERENCE_ENGINE = os.environ.get('MEDIAI_INFERENCE_ENGINE', 'sklearn')
+
+# Published model versions (models/versions/) with hot reload, see model_registry.py
+model_registry = ModelRegistry("models", INFERENCE_ENGINE)
+
+# Single-row results of /result, keyed on model version + encoded features
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('MEDIAI_PREDICTION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('MEDIAI_PREDICTION_CACHE_TTL', 3600)),
+    rounding=os.environ.get('MEDIAI_PREDICTION_CACHE_ROUNDING', '0') == '1',
+)
+# Entries from an older model version must never be served
+model_registry.on_swap(prediction_cache.clear)
+for _name in ('hits', 'misses', 'evictions'):
+    metrics.register_gauge(f"mediai_prediction_cache_{_name}_total", f"Prediction cache {_name} since start.",
+                           lambda _name=_name: getattr(prediction_cache, _name), kind="counter")
+
+# Feature contributions shown on /result, cached per model version + encoded features like predictions
+explanation_cache = PredictionCache(
+    max_entries=int(os.environ.get('MEDIAI_PREDICTION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('MEDIAI_PREDICTION_CACHE_TTL', 3600)),
+    rounding=prediction_cache.rounding,
+)
+model_registry.on_swap(explanation_cache.clear)
+for _name in ('hits', 'misses'):
+    metrics.register_gauge(f"mediai_explanation_cache_{_name}_total", f"Explanation cache {_name} since start.",
+                           lambda _name=_name: getattr(explanation_cache, _name), kind="counter")
+
+# Running statistics of /result inputs vs. the training data, shared by all workers through
+# data/state.db (see drift_monitor.py); MEDIAI_DRIFT_MONITOR=0 turns it off
+drift_monitor = None
+if os.environ.get('MEDIAI_DRIFT_MONITOR', '1') == '1':
+    drift_monitor = DriftMonitor(STATE_DB, float(os.environ.get('MEDIAI_DRIFT_MERGE_SECONDS', MERGE_SECONDS)))
+# Training statistics per model version, loaded on the first drift report
+training_stats_by_version = {}
+
+# Features listed on the result page, largest contribution first
+EXPLANATION_FEATURES = 6
+
+# Concurrent /result rows are scored together when a batching window is set (0 = off)
+BATCH_WINDOW_MS = float(os.environ.get('MEDIAI_BATCH_WINDOW_MS', 0))
+inference_batcher = MicroBatcher(BATCH_WINDOW_MS, int(os.environ.get('MEDIAI_BATCH_MAX_SIZE', 64))) if BATCH_WINDOW_MS > 0 else None
+
+# Upper bound on rows accepted by /api/predict_batch in one request
+MAX_BATCH_ROWS = 100000
+# ... and when explanations are requested as well
+MAX_EXPLAIN_ROWS = 10000
+
+# Admin dashboard paging
+DASHBOARD_PAGE_SIZE = 25
+DASHBOARD_MAX_PAGE_SIZE = 200
+
+# Doctor search paging
+DOCTOR_PAGE_SIZE = 20
+
+# Prediction history paging on the patient dashboard
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
 
 def load_models():
-    global unified_model, unified_scaler, unified_encoders
-    path_model = "models/unified_model.pkl"
-    path_scaler = "models/unified_scaler.pkl"
-    path_encoders = "models/unified_encoders.pkl"
-    
-    if os.path.exists(path_model) and os.path.exists(path_scaler) and os.path.exists(path_encoders):
-        unified_model = joblib.load(path_model)
-        unified_scaler = joblib.load(path_scaler)
-        unified_encoders = joblib.load(path_encoders)
-        print("Unified Model Loaded Successfully.")
+    bundle = model_registry.load()
+    if bundle is not None:
+        # Compact versions are compiled-only, so the engine can differ from MEDIAI_INFERENCE_ENGINE
+        engine = 'compiled' if bundle.engine is not None else 'sklearn'
+        print(f"Unified Model Loaded Successfully (version {bundle.version}, {engine} engine).")
     else:
         print("Unified Model not found. Please train models first.")
 
+def current_model():
+    """Model bundle for this request; hold on to it so one request never mixes versions."""
+    return model_registry.current()
+
 load_models()
 
+def score_features(features, bundle=None):
+    """Scale and score a feature matrix in one pass. Returns (labels, probabilities)."""
+    return (bundle or model_registry.current()).score(features)
+
+def explain_row(features, bundle):
+    """(bias, contributions) of one (1, 13) row; contributions has shape (13, classes)."""
+    bias, contributions = bundle.explain(features)
+    row = contributions[0]
+    row.setflags(write=False)
+    return bias, row
+
+def score_row(features, bundle):
+    """Score one (1, 13) row, through the micro-batcher when it is enabled."""
+    if inference_batcher is not None:
+        return inference_batcher.score(bundle, features)
+    return score_features(features, bundle)
+
+@app.before_request
+def check_model_version():
+    # Throttled stat of models/LATEST and models/PINNED; a new version loads in the background
+    model_registry.maybe_reload()
+
 # --- Routes ---
 
 @app.route('/')
@@ -72,15 +160,8 @@ def login():
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
-        # Generate Random Patient ID
-        import random
-        patients = get_patients()
-        existing_ids = patients['Patient ID'].astype(str).values if not patients.empty else []
-        
-        while True:
-            new_id = str(random.randint(1200, 1900))
-            if new_id not in existing_ids:
-                break
+        # Allocate Patient ID (persisted counter, safe across workers)
+        new_id = allocate_patient_id()
         
         patient_data = {
             "Patient ID": new_id,
@@ -99,6 +180,15 @@ def register():
             
     return render_template('register.html')
 
+def history_context(patient_id):
+    """Template values for one page of a patient's history (newest first) and their summary."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+    history, total = get_patient_history_page(patient_id, page, per_page)
+    pages = max((total + per_page - 1) // per_page, 1)
+    return dict(history=history, history_total=total, page=page, pages=pages, per_page=per_page,
+                summary=get_patient_history_summary(patient_id))
+
 @app.route('/patient_dashboard')
 def patient_dashboard():
     if not session.get('logged_in') or session.get('usertype') != 'patient':
@@ -106,18 +196,14 @@ def patient_dashboard():
         
     patient_id = session.get('patient_id')
     patient = get_patient_by_id(patient_id)
-    history = get_patient_history(patient_id)
     
-    if patient is not None:
-        # patient is already a dict from get_patient_by_id
-        print("DEBUG: Patient Data for Dashboard:", patient) # Debug print
-    else:
+    if patient is None:
         # If patient ID from session is invalid/not found
         session.clear()
         flash('Session expired or invalid. Please login again.', 'warning')
         return redirect(url_for('login'))
         
-    return render_template('patient_dashboard.html', patient=patient, history=history)
+    return render_template('patient_dashboard.html', patient=patient, **history_context(patient_id))
 
 
 
@@ -128,17 +214,12 @@ def view_patient_records(patient_id):
         return redirect(url_for('login'))
         
     patient = get_patient_by_id(patient_id)
-    history = get_patient_history(patient_id)
     
-    if patient is not None:
-        # patient is already a dict
-        print("DEBUG: Admin View - Patient Data:", patient)
-    else:
+    if patient is None:
         flash('Patient not found.', 'danger')
-        print("DEBUG: Admin View - Patient not found")
         return redirect(url_for('dashboard'))
         
-    return render_template('patient_dashboard.html', patient=patient, history=history, view_only=True)
+    return render_template('patient_dashboard.html', patient=patient, view_only=True, **history_context(patient_id))
 
 
 @app.route('/logout')
@@ -156,14 +237,29 @@ def dashboard():
     if session.get('usertype') == 'patient':
         return redirect(url_for('patient_dashboard'))
         
-    patients_df = get_patients()
-    patients = patients_df.to_dict('records') # Convert DataFrame to list of dicts for Jinja
+    # Filters, sorting and paging come from the query string
+    search = request.args.get('q', '').strip()
+    gender = request.args.get('gender', '')
+    city = request.args.get('city', '')
+    sort = request.args.get('sort', 'Patient ID')
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', DASHBOARD_PAGE_SIZE, type=int), 1), DASHBOARD_MAX_PAGE_SIZE)
     
-    total = len(patients)
-    male = len([p for p in patients if p.get('Gender') == 'Male'])
-    female = len([p for p in patients if p.get('Gender') == 'Female'])
+    patients, matching = get_patients_page(search, gender, city, sort, order == 'desc', page, per_page)
+    pages = max((matching + per_page - 1) // per_page, 1)
     
-    return render_template('dashboard.html', patients=patients, total_patients=total, male_patients=male, female_patients=female)
+    # Counters are kept up to date as patients are added, not recounted here
+    stats = get_patient_summary()
+    
+    return render_template('dashboard.html', patients=patients,
+                           total_patients=stats.total,
+                           male_patients=stats.gender.get('Male', 0),
+                           female_patients=stats.gender.get('Female', 0),
+                           top_cities=stats.top_cities(5),
+                           cities=sorted(stats.city),
+                           matching=matching, page=page, pages=pages, per_page=per_page,
+                           search=search, gender=gender, city=city, sort=sort, order=order)
 
 @app.route('/predict')
 def predict_page():
@@ -185,74 +281,254 @@ def predict_result():
     if not session.get('logged_in'):
         return redirect(url_for('login'))
         
-    if unified_model is None:
+    bundle = current_model()
+    if bundle is None:
         flash('Unified Model not loaded. Please train models.', 'danger')
         return redirect(url_for('dashboard'))
         
     try:
         # 1. Collect Input Data
-        age = float(request.form['age'])
-        gender = request.form['gender']
-        bmi = float(request.form['bmi'])
-        bp_sys = float(request.form['bp_sys'])
-        bp_dia = float(request.form['bp_dia'])
-        glucose = float(request.form['glucose'])
-        chol = float(request.form['chol'])
-        smoking = request.form['smoking']
-        alcohol = request.form['alcohol']
-        activity = request.form['activity']
-        diet = request.form['diet']
-        sleep = float(request.form['sleep'])
-        family_history = request.form['family_history']
-        
-        # 2. Encode Categorical Data
-        def safe_transform(name, val):
-            if name not in unified_encoders:
-                return 0
-            le = unified_encoders[name]
-            if val in le.classes_:
-                return le.transform([val])[0]
-            # Fallback for unknown classes? Assign most common or 0
-            return 0 
-            
-        gender_enc = safe_transform('Gender', gender)
-        smoking_enc = safe_transform('Smoking', smoking)
-        alcohol_enc = safe_transform('AlcoholIntake', alcohol)
-        activity_enc = safe_transform('PhysicalActivity', activity)
-        diet_enc = safe_transform('DietQuality', diet)
-        history_enc = safe_transform('FamilyHistory', family_history)
+        with stage("parse_form"):
+            age = float(request.form['age'])
+            gender = request.form['gender']
+            bmi = float(request.form['bmi'])
+            bp_sys = float(request.form['bp_sys'])
+            bp_dia = float(request.form['bp_dia'])
+            glucose = float(request.form['glucose'])
+            chol = float(request.form['chol'])
+            smoking = request.form['smoking']
+            alcohol = request.form['alcohol']
+            activity = request.form['activity']
+            diet = request.form['diet']
+            sleep = float(request.form['sleep'])
+            family_history = request.form['family_history']
         
-        # 3. Create Feature Array
-        # Order MUST match training: 
-        # Age, Gender, BMI, BP_Sys, BP_Dia, Glucose, Cholesterol, Smoking, Alcohol, Activity, Diet, Sleep, History
-        features = [[
-            age, gender_enc, bmi, bp_sys, bp_dia, glucose, chol, 
-            smoking_enc, alcohol_enc, activity_enc, diet_enc, sleep, 
-            history_enc
-        ]]
+        # 2. Encode Categorical Data & 3. Create Feature Array
+        # Categorical fields go through the precomputed lookup tables (unknown -> 0)
+        with stage("encode"):
+            features = row_to_features(bundle.tables, request.form)
         
-        # 4. Scale
-        features_scaled = unified_scaler.transform(features)
+        # 3b. Track input drift (O(1) per request; merged into the shared state every few seconds)
+        if drift_monitor is not None:
+            with stage("drift"):
+                drift_monitor.observe(request.form, bundle.tables)
         
-        # 5. Predict
-        prediction = unified_model.predict(features_scaled)[0]
-        probabilities = unified_model.predict_proba(features_scaled)[0]
+        # 4. Scale & 5. Predict (repeat submissions are served from the cache)
+        with stage("predict"):
+            prediction, probabilities = prediction_cache.score(
+                bundle.version, features, lambda rows: score_row(rows, bundle))
         max_prob = max(probabilities)
         
+        # 5b. Explain: which inputs moved the predicted class's probability, and by how much
+        bias, contributions = explanation_cache.get(bundle.version, features, lambda rows: explain_row(rows, bundle))
+        class_index = bundle.classes_.tolist().index(prediction)
+        explanation = top_contributions(contributions, class_index, values=request.form, limit=EXPLANATION_FEATURES)
+        
         # 6. Save History
         if session.get('usertype') == 'patient':
-            input_details = f"Age:{age}, BMI:{bmi}, BP:{bp_sys}/{bp_dia}, Gluc:{glucose}, Chol:{chol}, Smoke:{smoking}, Alc:{alcohol}, Act:{activity}, Diet:{diet}, Sleep:{sleep}"
-            save_prediction(session.get('patient_id'), prediction, round(max_prob * 100, 2), inputs=input_details)
+            input_details = f"Age:{age}, Gender:{gender}, BMI:{bmi}, BP:{bp_sys}/{bp_dia}, Gluc:{glucose}, Chol:{chol}, Smoke:{smoking}, Alc:{alcohol}, Act:{activity}, Diet:{diet}, Sleep:{sleep}, Hist:{family_history}"
+            input_values = dict(age=age, gender=gender, bmi=bmi, bp_sys=bp_sys, bp_dia=bp_dia, glucose=glucose, chol=chol,
+                                smoking=smoking, alcohol=alcohol, activity=activity, diet=diet, sleep=sleep,
+                                family_history=family_history)
+            save_prediction(session.get('patient_id'), prediction, round(max_prob * 100, 2), inputs=input_details,
+                            model_version=bundle.version, features=input_values)
+            
+        # 7. Recommend specialists for the predicted condition, near the patient when known
+        city = None
+        if session.get('usertype') == 'patient':
+            patient = get_patient_by_id(session.get('patient_id')) or {}
+            city = patient.get('City/Village') or None
+        specialization, doctors, doctors_in_city = recommend_doctors(prediction, city)
             
-        return render_template('result.html', prediction=prediction, probability=max_prob, disease="Unified Analysis")
+        with stage("render"):
+            return render_template('result.html', prediction=prediction, probability=max_prob, disease="Unified Analysis",
+                                   explanation=explanation, baseline=float(bias[class_index]),
+                                   specialization=specialization, doctors=doctors, city=city,
+                                   doctors_in_city=doctors_in_city)
         
     except Exception as e:
         flash(f'Error processing prediction: {str(e)}', 'danger')
-        print(f"Error: {e}") # Debug print
+        app.logger.exception("Prediction failed")
         return redirect(url_for('predict_page'))
 
 
 
+@app.route('/api/predict_batch', methods=['POST'])
+def predict_batch():
+    """Score many feature rows at once: {"rows": [{"age": .., "gender": .., ...}, ...]}.
+
+    With "explain": true (or ?explain=1) every result also carries the
+    per-feature contributions towards its predicted class.
+    """
+    if not session.get('logged_in'):
+        return jsonify({"error": "Login required."}), 401
+        
+    bundle = current_model()
+    if bundle is None:
+        return jsonify({"error": "Unified Model not loaded. Please train models."}), 503
+        
+    payload = request.get_json(silent=True)
+    rows = payload.get('rows') if isinstance(payload, dict) else payload
+    explain = (isinstance(payload, dict) and bool(payload.get('explain'))) or request.args.get('explain') == '1'
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Expected a non-empty list of rows."}), 400
+    if len(rows) > MAX_BATCH_ROWS:
+        return jsonify({"error": f"Too many rows (max {MAX_BATCH_ROWS})."}), 413
+    if explain and len(rows) > MAX_EXPLAIN_ROWS:
+        return jsonify({"error": f"Too many rows to explain (max {MAX_EXPLAIN_ROWS})."}), 413
+        
+    try:
+        features = rows_to_features(bundle.tables, rows)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid rows: {str(e)}"}), 400
+        
+    labels, probabilities = score_features(features, bundle)
+    max_probs = probabilities.max(axis=1)
+    
+    results = [
+        {"prediction": label, "probability": round(float(prob), 4)}
+        for label, prob in zip(labels.tolist(), max_probs.tolist())
+    ]
+    response = {"count": len(results), "classes": bundle.classes_.tolist(), "model_version": bundle.version}
+    if explain:
+        bias, contributions = bundle.explain(features)
+        # Contributions towards each row's own predicted class, (rows, 13)
+        predicted = probabilities.argmax(axis=1)
+        picked = np.round(contributions[np.arange(len(rows)), :, predicted], 4).tolist()
+        for result, row, class_index in zip(results, picked, predicted.tolist()):
+            result["baseline"] = round(float(bias[class_index]), 4)
+            result["contributions"] = dict(zip(FIELD_NAMES, row))
+    response["results"] = results
+    return jsonify(response)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: request/stage latency histograms and cache counters."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# --- Model versions (admin) ---
+
+def model_versions_response():
+    bundle = current_model()
+    return jsonify({
+        "serving": bundle.version if bundle is not None else None,
+        "latest": model_registry.latest(),
+        "pinned": model_registry.pinned(),
+        "versions": [dict(model_registry.manifest(v), version=v) for v in model_registry.versions()],
+    })
+
+@app.route('/admin/models')
+def admin_models():
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    return model_versions_response()
+
+@app.route('/admin/cache')
+def admin_cache():
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    return jsonify(prediction_cache.stats())
+
+@app.route('/admin/analytics')
+def admin_analytics():
+    """Predicted-disease counts by city, age band and gender (?dimension= for just one)."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    distribution = get_disease_distribution()
+    dimension = request.args.get('dimension')
+    if dimension:
+        if dimension not in distribution:
+            return jsonify({"error": f"Unknown dimension '{dimension}'; use one of {', '.join(distribution)}."}), 400
+        distribution = {dimension: distribution[dimension]}
+    # Every record is counted once per dimension
+    any_dimension = next(iter(distribution.values()))
+    records = sum(sum(counts.values()) for counts in any_dimension.values())
+    return jsonify({"records": records, **distribution})
+
+@app.route('/admin/drift')
+def admin_drift():
+    """Live /result inputs vs. the serving model's training statistics, with per-feature drift scores."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    if drift_monitor is None:
+        return jsonify({"error": "Drift monitor is off (MEDIAI_DRIFT_MONITOR=0)."}), 404
+    bundle = current_model()
+    if bundle is None:
+        return jsonify({"error": "Unified Model not loaded. Please train models."}), 503
+    training = training_stats_by_version.get(bundle.version)
+    if training is None:
+        training = load_training_stats(model_registry.version_dir(bundle.version), bundle.tables)
+        training_stats_by_version[bundle.version] = training
+    return jsonify(dict(drift_monitor.report(training), model_version=bundle.version))
+
+@app.route('/admin/drift/reset', methods=['POST'])
+def admin_drift_reset():
+    """Start the statistics over, e.g. after publishing a model trained on new data."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    if drift_monitor is None:
+        return jsonify({"error": "Drift monitor is off (MEDIAI_DRIFT_MONITOR=0)."}), 404
+    drift_monitor.reset()
+    return jsonify({"reset": True})
+
+@app.route('/admin/patients/import', methods=['POST'])
+def admin_import_patients():
+    """Bulk-add patients from a CSV: a file upload from the dashboard or the raw request body."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+        
+    upload = request.files.get('file')
+    # Uploads are spooled to a temporary file by Werkzeug and parsed a chunk at a time
+    try:
+        report = import_patients(upload.stream if upload else request.stream)
+    except ValueError as e:  # also pandas' parse errors and undecodable files
+        if upload:
+            flash(f'Import failed: {e}', 'danger')
+            return redirect(url_for('dashboard'))
+        return jsonify({"error": str(e)}), 400
+        
+    if upload:
+        flash(f"Imported {report['imported']} patients, skipped {report['skipped']} already registered, "
+              f"rejected {report['rejected']} invalid rows.", 'success' if not report['rejected'] else 'warning')
+        return redirect(url_for('dashboard'))
+    return jsonify(report)
+
+@app.route('/admin/export/<table>')
+def admin_export(table):
+    """Stream the patients or history table as CSV (default) or JSON (?format=json)."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+    fmt = request.args.get('format', 'csv')
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"Unknown table '{table}'; use one of {', '.join(EXPORT_TABLES)}."}), 404
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": f"Unknown format '{fmt}'; use one of {', '.join(EXPORT_MIMETYPES)}."}), 400
+    return Response(stream_with_context(export_table(table, fmt)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={table}.{fmt}"})
+
+@app.route('/admin/models/<action>', methods=['POST'])
+def admin_models_action(action):
+    """Pin a version ({"version": ...}), unpin, or roll back to the previous version."""
+    if not session.get('logged_in') or session.get('usertype') != 'admin':
+        return jsonify({"error": "Admin login required."}), 403
+        
+    payload = request.get_json(silent=True) or request.form
+    try:
+        if action == 'pin':
+            model_registry.pin(str(payload.get('version', '')))
+        elif action == 'unpin':
+            model_registry.unpin()
+        elif action == 'rollback':
+            model_registry.rollback()
+        else:
+            return jsonify({"error": f"Unknown action: {action}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    # Load now in this worker; the others pick the change up on their next check
+    model_registry.load()
+    return model_versions_response()
+
 @app.route('/find_doctor', methods=['GET', 'POST'])
 def find_doctor():
     if not session.get('logged_in'):
@@ -264,12 +540,15 @@ def find_doctor():
     selected_spec = ""
     doctors = []
     searched = False
+    total = 0
+    page = max(request.args.get('page', 1, type=int), 1)
     
-    if request.method == 'POST':
+    # The search form posts; page links and the result page's shortcut use the query string
+    if request.method == 'POST' or 'city' in request.args or 'specialization' in request.args:
         searched = True
-        selected_city = request.form.get('city')
-        selected_spec = request.form.get('specialization')
-        doctors = search_doctors(selected_city, selected_spec)
+        selected_city = request.values.get('city', '')
+        selected_spec = request.values.get('specialization', '')
+        doctors, total = search_doctors(selected_city, selected_spec, page, DOCTOR_PAGE_SIZE)
         
     return render_template('find_doctor.html', 
                            cities=cities, 
@@ -277,7 +556,9 @@ def find_doctor():
                            doctors=doctors,
                            searched=searched,
                            selected_city=selected_city,
-                           selected_spec=selected_spec)
+                           selected_spec=selected_spec,
+                           total=total, page=page,
+                           pages=max((total + DOCTOR_PAGE_SIZE - 1) // DOCTOR_PAGE_SIZE, 1))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,130 @@
+"""Offline re-scoring of every patient's latest recorded inputs with the current model.
+
+Usage: python batch_score.py [--output data/risk_report.csv] [--workers N] [--engine sklearn]
+
+Meant as a nightly job, e.g. after a retrain. The patients in the history
+store are split into Patient ID ranges (HistoryStore.patient_ranges) and a
+process pool scores one range per task: each worker opens the store and the
+active model version once, loads its range's latest inputs itself, encodes
+them with the same preprocessing as app.py (rows_to_features) and scores the
+whole chunk in one call. Only the small report rows travel back to the parent,
+which writes them in Patient ID order, so the work scales with the number of
+cores. Patients whose latest inputs are missing or lack a numeric value
+(old free-text history that could not be parsed) are counted as skipped, so
+scored + skipped always equals the number of patients.
+
+The report has one row per patient: the date and result of the recorded
+prediction, the new result and risk score (same scale as /result) and
+whether the predicted disease changed.
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from history_store import HistoryStore
+from model_registry import ModelRegistry, load_bundle
+from preprocessing import CATEGORICAL_FIELDS, FIELD_NAMES, rows_to_features
+
+REPORT_COLUMNS = ["Patient ID", "Inputs Date", "Recorded Disease", "Recorded Risk Score",
+                  "Disease", "Risk Score", "Changed"]
+NUMERIC_FIELDS = [field for field in FIELD_NAMES if field not in CATEGORICAL_FIELDS]
+
+# Patients per task; large enough that one score() call amortizes the per-call overhead
+CHUNK_PATIENTS = 20000
+# Seconds between progress lines
+PROGRESS_SECONDS = 5.0
+
+_store = None
+_bundle = None
+
+
+def _init_worker(history_db, model_dir, version, engine):
+    global _store, _bundle
+    _store = HistoryStore(history_db)
+    _bundle = load_bundle(model_dir, version, engine)
+
+
+def score_range(bounds):
+    """Score one Patient ID range in a worker. Returns (report rows, skipped patients)."""
+    rows = _store.latest_inputs(*bounds)
+    frame = pd.DataFrame.from_records(rows, columns=["patient_id", "date", "disease", "risk_score"] + FIELD_NAMES)
+    complete = frame[NUMERIC_FIELDS].notna().all(axis=1).to_numpy()
+    frame = frame[complete]
+    if frame.empty:
+        return [], int((~complete).sum())
+
+    # Unknown or missing categories encode as UNKNOWN_CODE, as on /result
+    labels, probabilities = _bundle.score(rows_to_features(_bundle.tables, frame))
+    scores = np.round(probabilities.max(axis=1) * 100, 2)
+    report = [
+        (pid, date, disease, risk_score, label, score, "yes" if label != disease else "no")
+        for pid, date, disease, risk_score, label, score in zip(
+            frame["patient_id"].tolist(), frame["date"].tolist(), frame["disease"].tolist(),
+            frame["risk_score"].tolist(), labels.tolist(), scores.tolist())
+    ]
+    return report, int((~complete).sum())
+
+
+def run(output, history_db, models_dir="models", engine="sklearn", workers=None, chunk_patients=CHUNK_PATIENTS):
+    """Write the risk report for every patient to `output`. Returns a summary dict."""
+    registry = ModelRegistry(models_dir, engine)
+    version = registry.active_version()
+    model_dir = registry.version_dir(version)
+    if load_bundle(model_dir, version, engine) is None:
+        raise FileNotFoundError(f"Model version {version} is incomplete. Please train models first.")
+
+    store = HistoryStore(history_db)
+    total = store.patient_count()
+    ranges = store.patient_ranges(chunk_patients)
+    workers = workers or os.cpu_count()
+    print(f"Scoring {total:,} patients with model {version} ({engine} engine), "
+          f"{len(ranges)} chunks on {workers} workers")
+
+    summary = {"version": version, "patients": total, "scored": 0, "skipped": 0, "changed": 0}
+    start = last_progress = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(history_db, model_dir, version, engine)) as pool, \
+            open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for report, skipped in pool.map(score_range, ranges):
+            writer.writerows(report)
+            summary["scored"] += len(report)
+            summary["skipped"] += skipped
+            summary["changed"] += sum(1 for row in report if row[-1] == "yes")
+            done += len(report) + skipped
+            now = time.perf_counter()
+            if now - last_progress >= PROGRESS_SECONDS:
+                print(f"  {done:,}/{total:,} patients ({done / total:.0%}), {done / (now - start):,.0f} patients/s")
+                last_progress = now
+
+    summary["seconds"] = time.perf_counter() - start
+    print(f"Scored {summary['scored']:,} patients in {summary['seconds']:.1f} s "
+          f"({summary['scored'] / max(summary['seconds'], 1e-9):,.0f} patients/s); "
+          f"{summary['changed']:,} changed disease, {summary['skipped']:,} skipped without complete inputs. "
+          f"Report: {output}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=os.path.join("data", "risk_report.csv"))
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--engine", choices=["sklearn", "compiled"], default="sklearn",
+                        help="compiled is only faster for single rows; compact versions always use it")
+    parser.add_argument("--chunk", type=int, default=CHUNK_PATIENTS, help="patients per task")
+    args = parser.parse_args()
+
+    from utils import HISTORY_DB, get_history_store
+    get_history_store()  # runs any pending history migration first
+    run(args.output, HISTORY_DB, engine=args.engine, workers=args.workers, chunk_patients=args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput and scaling of the offline batch risk scoring (batch_score.py).
+
+Usage: python benchmarks/bench_batch_score.py [--patients 1000000] [--workers 1 2 4] [--engine sklearn]
+
+Builds a synthetic history store once (one record per patient, inputs
+sampled from datasets/disease_dataset.csv), then re-scores every patient
+with each worker count and prints patients/s and the speedup over the
+first worker count. Scaling is bounded by the number of cores.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import batch_score  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+
+DATE = "2026-01-01 00:00:00"
+BUILD_CHUNK = 50000
+
+
+def input_texts():
+    """Inputs texts in the /result format, one per dataset row."""
+    df = pd.read_csv(os.path.join(ROOT, "datasets", "disease_dataset.csv"), keep_default_na=False)
+    return [
+        f"Age:{r.Age}, Gender:{r.Gender}, BMI:{r.BMI}, BP:{r.BloodPressure_Systolic}/{r.BloodPressure_Diastolic}, "
+        f"Gluc:{r.Glucose_Fasting_mg_dL}, Chol:{r.Cholesterol_Total_mg_dL}, Smoke:{r.Smoking}, Alc:{r.AlcoholIntake}, "
+        f"Act:{r.PhysicalActivity}, Diet:{r.DietQuality}, Sleep:{r.SleepHours}, Hist:{r.FamilyHistory}"
+        for r in df.itertuples(index=False)
+    ], df["TargetLabel"].tolist()
+
+
+def build_store(path, patients):
+    store = HistoryStore(path)
+    texts, labels = input_texts()
+    start = time.perf_counter()
+    for first in range(0, patients, BUILD_CHUNK):
+        store.append_many((str(1000000 + i), labels[i % len(labels)], 80.0, DATE, texts[i % len(texts)])
+                          for i in range(first, min(first + BUILD_CHUNK, patients)))
+    print(f"Built a history store of {patients:,} patients in {time.perf_counter() - start:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--engine", choices=["sklearn", "compiled"], default="sklearn",
+                        help="compiled is only faster for single rows; compact versions always use it")
+    parser.add_argument("--chunk", type=int, default=batch_score.CHUNK_PATIENTS, help="patients per task")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores available")
+    with tempfile.TemporaryDirectory() as workdir:
+        history_db = os.path.join(workdir, "history.db")
+        build_store(history_db, args.patients)
+        results = []
+        for workers in args.workers:
+            summary = batch_score.run(os.path.join(workdir, "report.csv"), history_db,
+                                      models_dir=os.path.join(ROOT, "models"), engine=args.engine,
+                                      workers=workers, chunk_patients=args.chunk)
+            results.append((workers, summary["scored"] / summary["seconds"]))
+
+    print(f"\n{'workers':>7} {'patients/s':>11} {'speedup':>8}")
+    for workers, rate in results:
+        print(f"{workers:>7} {rate:>11,.0f} {rate / results[0][1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Throughput of the bulk patient import and the streaming exports.
+
+Usage: python benchmarks/bench_bulk_import.py [--rows 100000] [--per-row 2000]
+
+In a scratch data directory: imports a synthetic screening-camp CSV through
+utils.import_patients, registers --per-row patients one at a time the way
+/register does (allocate_patient_id + add_patient) for comparison, then
+streams the patients table out as CSV and JSON. Peak resident memory is
+printed after each step.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_camp_csv(path, rows, seed=42):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("name,age,gender,blood_group,contact,city_village\n")
+        for i in range(rows):
+            f.write(f"Camp {i},{rng.randint(1, 90)},{rng.choice(['Male', 'Female'])},"
+                    f"{rng.choice(['A+', 'B+', 'O+', 'AB-', ''])},9{i:09d},Village {i % 200}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="patients in the imported CSV")
+    parser.add_argument("--per-row", type=int, default=2000, help="patients registered one at a time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # utils keeps its files under ./data
+        sys.path.insert(0, ROOT)
+        import utils
+
+        camp = os.path.join(workdir, "camp.csv")
+        write_camp_csv(camp, args.rows)
+        start = time.perf_counter()
+        report = utils.import_patients(camp)
+        elapsed = time.perf_counter() - start
+        print(f"Bulk import: {report['imported']} patients in {elapsed:.2f} s "
+              f"({report['imported'] / elapsed:,.0f}/s), peak {peak_mb():.0f} MB")
+
+        start = time.perf_counter()
+        for i in range(args.per_row):
+            utils.add_patient({
+                "Patient ID": utils.allocate_patient_id(), "Name": f"Walk-in {i}", "Age": "40", "Gender": "Female",
+                "Blood Group": "O+", "Contact": f"8{i:09d}", "City/Village": "Guntur", "Medical History": ""
+            })
+        elapsed = time.perf_counter() - start
+        print(f"One at a time: {args.per_row} patients in {elapsed:.2f} s ({args.per_row / elapsed:,.0f}/s)")
+
+        for fmt in ("csv", "json"):
+            start = time.perf_counter()
+            size = sum(len(text) for text in utils.export_table("patients", fmt))
+            elapsed = time.perf_counter() - start
+            print(f"Export patients as {fmt}: {size / 1e6:.1f} MB in {elapsed:.2f} s, peak {peak_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark doctor search: indexed directory vs. re-parsing the CSV per request.
+
+Usage: python benchmarks/bench_doctor_search.py [--rows 1000000]
+
+A synthetic doctor file is built by resampling datasets/doctor_dataset.csv.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from doctor_directory import CITY_COLUMN, SPECIALIZATION_COLUMN, DoctorDirectory, read_doctor_csv  # noqa: E402
+
+
+def make_synthetic(path, rows, seed=42):
+    """Resample the real dataset column-wise to the requested size."""
+    base = read_doctor_csv(os.path.join(ROOT, "datasets", "doctor_dataset.csv"))
+    rng = np.random.default_rng(seed)
+    synthetic = pd.DataFrame({col: base[col].to_numpy()[rng.integers(0, len(base), rows)] for col in base.columns})
+    synthetic.to_csv(path, index=False)
+    return synthetic
+
+
+def legacy_search(path, city, specialization):
+    """The old per-request path: parse the file, then two boolean masks."""
+    df = read_doctor_csv(path)
+    df = df[df[CITY_COLUMN] == city]
+    df = df[df[SPECIALIZATION_COLUMN] == specialization]
+    return df.to_dict('records')
+
+
+def legacy_options(path):
+    df = read_doctor_csv(path)
+    return sorted(df[CITY_COLUMN].dropna().unique().tolist()), sorted(df[SPECIALIZATION_COLUMN].dropna().unique().tolist())
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--legacy-repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "doctors.csv")
+        synthetic = make_synthetic(path, args.rows)
+        pairs = synthetic[[CITY_COLUMN, SPECIALIZATION_COLUMN]].drop_duplicates().itertuples(index=False)
+        pairs = [tuple(p) for p in pairs]
+        random.seed(42)
+        city, spec = random.choice(pairs)
+
+        directory = DoctorDirectory(path)
+        build_ms = timed(directory.index, 1)
+        search_ms = timed(lambda: directory.search(*random.choice(pairs)), args.searches)
+        options_ms = timed(directory.options, args.searches)
+
+        legacy_search_ms = timed(lambda: legacy_search(path, city, spec), args.legacy_repeat)
+        legacy_options_ms = timed(lambda: legacy_options(path), args.legacy_repeat)
+
+        print(f"Synthetic doctor file: {args.rows} rows, {len(pairs)} (city, specialization) pairs")
+        print(f"Index build (once per file change): {build_ms:10.1f} ms")
+        print(f"Search   indexed: {search_ms:10.3f} ms | legacy: {legacy_search_ms:10.1f} ms")
+        print(f"Options  indexed: {options_ms:10.3f} ms | legacy: {legacy_options_ms:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
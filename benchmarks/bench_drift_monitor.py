@@ -0,0 +1,75 @@
+"""Hot-path cost and cross-process correctness of the drift monitor.
+
+Usage: python benchmarks/bench_drift_monitor.py [--observations 100000] [--workers 3]
+
+Times DriftMonitor.observe (the per-/result cost) and one merge into the
+shared state, then has --workers processes observe disjoint slices of
+datasets/disease_dataset.csv, merging every few milliseconds, and checks
+that the merged means and standard deviations match a single pass over the
+whole dataset.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from drift_monitor import NUMERIC_FIELDS, DriftMonitor, load_training_stats  # noqa: E402
+from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, build_encoder_tables  # noqa: E402
+
+
+def load_rows():
+    df = pd.read_csv(os.path.join(ROOT, "datasets", "disease_dataset.csv"), keep_default_na=False)
+    return df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES)))
+
+
+def _observe_slice(args):
+    path, part, workers = args
+    tables = build_encoder_tables(joblib.load(os.path.join(ROOT, "models", "unified_encoders.pkl")))
+    monitor = DriftMonitor(path, merge_seconds=0.005)
+    for row in load_rows().to_dict("records")[part::workers]:
+        monitor.observe(row, tables)
+    monitor.merge()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--observations", type=int, default=100000, help="observe() calls to time")
+    parser.add_argument("--workers", type=int, default=3, help="processes in the merge check")
+    args = parser.parse_args()
+
+    tables = build_encoder_tables(joblib.load(os.path.join(ROOT, "models", "unified_encoders.pkl")))
+    frame = load_rows()
+    rows = frame.to_dict("records")
+    with tempfile.TemporaryDirectory() as workdir:
+        monitor = DriftMonitor(os.path.join(workdir, "timing.db"), merge_seconds=3600)
+        start = time.perf_counter()
+        for i in range(args.observations):
+            monitor.observe(rows[i % len(rows)], tables)
+        print(f"observe: {(time.perf_counter() - start) / args.observations * 1e6:.2f} us per prediction")
+        start = time.perf_counter()
+        monitor.merge()
+        print(f"merge: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        path = os.path.join(workdir, "shared.db")
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            pool.map(_observe_slice, [(path, part, args.workers) for part in range(args.workers)])
+        report = DriftMonitor(path).report(load_training_stats(os.path.join(ROOT, "models"), tables))
+
+    print(f"\n{args.workers} workers, {report['observations']} observations merged")
+    print(f"{'feature':>8} {'mean err':>9} {'std err':>9} {'shift':>7} {'var ratio':>9}")
+    for field in NUMERIC_FIELDS:
+        entry, column = report["features"][field], frame[field].astype(float)
+        print(f"{field:>8} {abs(entry['mean'] - column.mean()):>9.1e} {abs(entry['std'] - column.std(ddof=0)):>9.1e} "
+              f"{entry['mean_shift']:>7.3f} {entry['variance_ratio']:>9.3f}")
+    print(f"Drifting: {', '.join(report['drifting']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Latency of per-feature contribution explanations for the unified model.
+
+Usage: python benchmarks/bench_explain.py [--rows 300] [--batch 10000]
+
+Times single-row explanations (the /result path, cache bypassed) and one
+batch, and checks that bias + contributions adds up to the forest's
+probabilities for every row and class.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from model_registry import load_bundle  # noqa: E402
+from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, rows_to_features  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300, help="single-row explanations to time")
+    parser.add_argument("--batch", type=int, default=10000, help="rows in the batch explanation")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    bundle = load_bundle("models", "legacy", "compiled")
+    start = time.perf_counter()
+    bundle.explainer()
+    print(f"Explainer built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    df = pd.read_csv(os.path.join("datasets", "disease_dataset.csv"), nrows=max(args.rows, args.batch))
+    rows = df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES)))
+    X = rows_to_features(bundle.tables, rows)
+
+    latencies = []
+    for i in range(args.rows):
+        start = time.perf_counter()
+        bundle.explain(X[i % len(X)][np.newaxis])
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"Single row: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms")
+
+    batch = X[:args.batch]
+    start = time.perf_counter()
+    bias, contributions = bundle.explain(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Batch of {len(batch)}: {elapsed:.2f} s ({len(batch) / elapsed:,.0f} rows/s)")
+
+    _, proba = bundle.score(batch)
+    error = np.abs(bias + contributions.sum(axis=1) - proba).max()
+    print(f"Max |bias + contributions - probability|: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
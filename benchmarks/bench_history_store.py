@@ -0,0 +1,84 @@
+"""Benchmark history append and per-patient lookup cost as the store grows.
+
+Usage: python benchmarks/bench_history_store.py [--sizes 1000 10000 100000 1000000]
+
+For comparison, the legacy read-concat-rewrite CSV path is timed on the
+smaller sizes (it becomes impractically slow beyond that).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from history_store import CSV_COLUMNS, HistoryStore  # noqa: E402
+
+RECORDS_PER_PATIENT = 10
+DATE = "2026-01-01 00:00:00"
+INPUTS = "Age:45.0, BMI:27.1, BP:130.0/85.0, Gluc:110.0, Chol:210.0, Smoke:Never, Alc:None, Act:Low, Diet:Good, Sleep:7.0"
+
+
+def fake_records(n, start=0):
+    for i in range(start, start + n):
+        yield (str(1000000 + i // RECORDS_PER_PATIENT), "Healthy", 80.0, DATE, INPUTS)
+
+
+def per_op_us(fn, ops):
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def bench_sqlite(size, ops, workdir):
+    path = os.path.join(workdir, f"history_{size}.db")
+    store = HistoryStore(path)
+    store.append_many(fake_records(size))
+    n_patients = size // RECORDS_PER_PATIENT
+
+    append_us = per_op_us(lambda: store.append("999", "Diabetes", 70.0, DATE, INPUTS), ops)
+    lookup_us = per_op_us(lambda: store.get_patient_history(1000000 + random.randrange(n_patients)), ops)
+    return append_us, lookup_us
+
+
+def bench_legacy_csv(size, ops, workdir):
+    path = os.path.join(workdir, f"history_{size}.csv")
+    pd.DataFrame(list(fake_records(size)), columns=CSV_COLUMNS).to_csv(path, index=False)
+    n_patients = size // RECORDS_PER_PATIENT
+
+    def append():
+        history = pd.read_csv(path)
+        record = pd.DataFrame([dict(zip(CSV_COLUMNS, ("999", "Diabetes", 70.0, DATE, INPUTS)))])
+        pd.concat([history, record], ignore_index=True).to_csv(path, index=False)
+
+    def lookup():
+        df = pd.read_csv(path).fillna("")
+        df[df["Patient ID"].astype(str) == str(1000000 + random.randrange(n_patients))].to_dict("records")
+
+    return per_op_us(append, ops), per_op_us(lookup, ops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--ops", type=int, default=1000, help="appends/lookups timed per size")
+    parser.add_argument("--legacy-max", type=int, default=100000, help="largest size to time the legacy CSV path on")
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'records':>10} | {'sqlite append':>14} | {'sqlite lookup':>14} | {'csv append':>12} | {'csv lookup':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            append_us, lookup_us = bench_sqlite(size, args.ops, workdir)
+            legacy = "-", "-"
+            if size <= args.legacy_max:
+                legacy = tuple(f"{v:.0f} us" for v in bench_legacy_csv(size, max(1, args.ops // 100), workdir))
+            print(f"{size:>10} | {append_us:>11.1f} us | {lookup_us:>11.1f} us | {legacy[0]:>12} | {legacy[1]:>12}")
+
+
+if __name__ == "__main__":
+    main()
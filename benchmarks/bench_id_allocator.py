@@ -0,0 +1,80 @@
+"""Allocate 1M patient IDs from several processes and check none are lost or repeated.
+
+Usage: python benchmarks/bench_id_allocator.py [--total 1000000] [--workers 1 2 4]
+
+Also shows how the old random.randint(1200, 1900) retry loop degrades as
+its 701-ID range fills up.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from id_allocator import FIRST_PATIENT_ID, PATIENT_COUNTER, IdAllocator  # noqa: E402
+
+
+def _allocate(args):
+    path, n = args
+    allocator = IdAllocator(path)
+    return np.array([allocator.allocate(PATIENT_COUNTER) for _ in range(n)], dtype=np.int64)
+
+
+def bench_counter(total, workers, workdir):
+    path = os.path.join(workdir, f"state_{workers}.db")
+    allocator = IdAllocator(path)
+    allocator.seed(PATIENT_COUNTER, FIRST_PATIENT_ID - 1)
+
+    per_worker = [total // workers + (1 if i < total % workers else 0) for i in range(workers)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        ids = np.concatenate(pool.map(_allocate, [(path, n) for n in per_worker]))
+    elapsed = time.perf_counter() - start
+
+    unique = len(np.unique(ids)) == total
+    contiguous = ids.min() == FIRST_PATIENT_ID and ids.max() == FIRST_PATIENT_ID + total - 1
+    return elapsed, unique and contiguous
+
+
+def bench_legacy_random(fill_levels, trials=200):
+    """Average randint draws needed to find a free ID at a given fill level."""
+    rng = random.Random(42)
+    results = []
+    for used in fill_levels:
+        existing = np.array([str(i) for i in range(1200, 1200 + used)])
+        draws = 0
+        for _ in range(trials):
+            while True:
+                draws += 1
+                if str(rng.randint(1200, 1900)) not in existing:
+                    break
+        results.append((used, draws / trials))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--total", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"Counter allocator, {args.total} registrations")
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            elapsed, ok = bench_counter(args.total, workers, workdir)
+            print(f"  {workers} worker(s): {elapsed:7.1f} s, {args.total / elapsed:9.0f} IDs/s, "
+                  f"{elapsed / args.total * 1e6:6.1f} us/ID, all unique & contiguous: {ok}")
+
+    print("Legacy random.randint(1200, 1900) loop (701 IDs total)")
+    for used, draws in bench_legacy_random([0, 350, 600, 690, 700]):
+        print(f"  {used:3d} IDs used: {draws:6.1f} draws per registration")
+    print("  701 IDs used: never terminates")
+
+
+if __name__ == "__main__":
+    main()
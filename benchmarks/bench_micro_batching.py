@@ -0,0 +1,84 @@
+"""Load test: per-request scoring vs. the micro-batching scheduler.
+
+Usage: python benchmarks/bench_micro_batching.py [--engine sklearn] [--requests 2000]
+
+Each client thread scores single rows from the disease dataset back to back,
+either directly (the per-request path) or through MicroBatcher with several
+wait windows. Reports throughput, mean batch size and per-request latency.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from micro_batcher import MicroBatcher  # noqa: E402
+from model_registry import LEGACY_VERSION, load_bundle  # noqa: E402
+from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, rows_to_features  # noqa: E402
+
+
+def load_rows(bundle, n):
+    df = pd.read_csv(os.path.join(ROOT, "datasets", "disease_dataset.csv"), keep_default_na=False)
+    rows = df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES)))
+    X = rows_to_features(bundle.tables, rows)
+    return X[np.random.default_rng(42).integers(0, len(X), n)]
+
+
+def run(score, X, threads):
+    """Split X across `threads` clients; returns (elapsed seconds, per-request latencies in ms)."""
+    latencies = [[] for _ in range(threads)]
+
+    def client(i):
+        for row in X[i::threads]:
+            start = time.perf_counter()
+            score(row[np.newaxis])
+            latencies[i].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start, np.concatenate([np.array(l) for l in latencies])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", choices=["sklearn", "compiled"], default="sklearn")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--windows", type=float, nargs="+", default=[1, 2, 5], help="wait windows in ms")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundle = load_bundle(os.path.join(ROOT, "models"), LEGACY_VERSION, args.engine)
+    X = load_rows(bundle, args.requests)
+
+    # Batched and per-row results must agree exactly
+    batcher = MicroBatcher(2, args.max_batch)
+    _, direct = bundle.score(X[:200])
+    batched = np.vstack([batcher.score(bundle, row[np.newaxis])[1] for row in X[:200]])
+    assert np.array_equal(direct, batched), "batched probabilities differ"
+
+    print(f"{args.engine} engine, {args.requests} requests, max batch {args.max_batch}")
+    print(f"{'threads':>7} {'mode':<14} {'req/s':>9} {'avg batch':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for threads in args.threads:
+        modes = [("per-request", None)] + [(f"batch {w:g}ms", MicroBatcher(w, args.max_batch)) for w in args.windows]
+        for name, batcher in modes:
+            score = (lambda row: bundle.score(row)) if batcher is None else (lambda row, b=batcher: b.score(bundle, row))
+            elapsed, latencies = run(score, X, threads)
+            avg_batch = batcher.rows / batcher.batches if batcher is not None and batcher.batches else 1.0
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(f"{threads:>7} {name:<14} {len(X) / elapsed:>9.0f} {avg_batch:>9.1f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Load time and memory of the patients table per storage backend (CSV vs. Parquet).
+
+Usage: python benchmarks/bench_patient_storage.py [--rows 1000000]
+
+A synthetic table is written once per backend; each measurement then runs
+in a fresh interpreter so the memory it reports (resident memory still held
+after the load, in MB) belongs to that load alone:
+full read, two-column read, filtered read (one city) and a cold
+PatientRegistry load (read + indexes). Also times one append followed by
+the registry's incremental refresh. Parquet is skipped without pyarrow.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from generate_comprehensive_data import PATIENT_COLUMNS, patient_chunks, write_chunks  # noqa: E402
+from patient_storage import open_patient_storage  # noqa: E402
+
+OPERATIONS = ["full", "columns", "filtered", "registry", "append"]
+
+
+def open_storage(kind, workdir):
+    return open_patient_storage(kind, os.path.join(workdir, "patients.csv"),
+                                os.path.join(workdir, "patients.parquet"), PATIENT_COLUMNS)
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def measure(kind, workdir, operation):
+    """Runs in a child process: one operation, then its time and the memory it holds as JSON."""
+    from patient_registry import PatientRegistry
+    storage = open_storage(kind, workdir)
+    base_mb = rss_mb()
+    start = time.perf_counter()
+    if operation == "full":
+        held = storage.read()
+    elif operation == "columns":
+        held = storage.read(columns=["Patient ID", "City/Village"])
+    elif operation == "filtered":
+        held = storage.read(filters=[("City/Village", "==", "Guntur")])
+    elif operation == "registry":
+        held = PatientRegistry(storage)
+        len(held)
+    else:
+        held = PatientRegistry(storage)
+        before = len(held)
+        base_mb = rss_mb()
+        start = time.perf_counter()
+        record = {"Patient ID": "99999999", "Name": "Bench", "City/Village": "Guntur"}
+        storage.append(held.columns(), record)
+        assert len(held) == before + 1
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "rows": len(held), "held_mb": rss_mb() - base_mb}))
+
+
+def size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--child", nargs=3, metavar=("KIND", "WORKDIR", "OPERATION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child)
+        return
+
+    try:
+        import pyarrow  # noqa: F401
+        kinds = ["csv", "parquet"]
+    except ImportError:
+        print("pyarrow is not installed: measuring the CSV backend only.")
+        kinds = ["csv"]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        write_chunks(patient_chunks(args.rows), os.path.join(workdir, "patients.csv"))
+        print(f"Synthetic patients: {args.rows} rows ({time.perf_counter() - start:.1f}s to generate)")
+        if "parquet" in kinds:
+            open_storage("parquet", workdir)  # converts from the CSV once
+
+        print(f"{'backend':<8} {'size MB':>8} " + " ".join(f"{op + ' s':>11} {'MB':>6}" for op in OPERATIONS))
+        for kind in kinds:
+            path = os.path.join(workdir, "patients.csv" if kind == "csv" else "patients.parquet")
+            cells = []
+            for operation in OPERATIONS:
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", kind, workdir, operation],
+                                     capture_output=True, text=True, check=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                cells.append(f"{result['seconds']:>11.3f} {result['held_mb']:>6.0f}")
+            print(f"{kind:<8} {size_mb(path):>8.1f} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Route-level latency and throughput through Flask's test client, at growing data sizes.
+
+Usage: python benchmarks/bench_routes.py [--sizes 1000 100000 1000000] [--requests 200]
+                                        [--out results.json] [--compare baseline.json]
+
+For each size a scratch directory gets a synthetic data/patients.csv and
+data/history.db with that many rows (generate_comprehensive_data.py,
+structured inputs and analytics already migrated), and a
+fresh interpreter imports app.py there, so sizes never share caches. Each
+route is called --requests times after a short warm-up; the first call
+(cold cache load) is reported separately. Runs fully offline.
+
+--compare prints the p50/p95 ratio against an earlier results file and exits
+with status 1 when any route got slower than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FORM = {'age': 50, 'gender': 'Male', 'bmi': 30, 'bp_sys': 150, 'bp_dia': 95, 'glucose': 100, 'chol': 200,
+        'smoking': 'Never', 'alcohol': 'None', 'activity': 'Low', 'diet': 'Poor', 'sleep': 7,
+        'family_history': 'Hypertension'}
+
+
+def prepare(workdir, size, seed):
+    """Synthetic patients.csv and history.db with `size` rows each under workdir/data."""
+    sys.path.insert(0, ROOT)
+    from generate_comprehensive_data import history_chunks, patient_chunks, write_chunks
+    from history_store import HistoryStore
+
+    os.makedirs(os.path.join(workdir, "data"))
+    os.makedirs(os.path.join(workdir, "datasets"))
+    os.symlink(os.path.join(ROOT, "models"), os.path.join(workdir, "models"))
+    os.symlink(os.path.join(ROOT, "datasets", "doctor_dataset.csv"), os.path.join(workdir, "datasets", "doctor_dataset.csv"))
+
+    write_chunks(patient_chunks(size, seed), os.path.join(workdir, "data", "patients.csv"))
+    store = HistoryStore(os.path.join(workdir, "data", "history.db"))
+    for chunk in history_chunks(size, seed, patients=size):
+        store.append_many(chunk.itertuples(index=False))
+    # The one-time city/gender backfill belongs to setup, not to the first timed request
+    patients = pd.read_csv(os.path.join(workdir, "data", "patients.csv"), dtype=str, keep_default_na=False,
+                           usecols=["Patient ID", "City/Village", "Gender"])
+    store.migrate_structured(dict(zip(patients["Patient ID"], zip(patients["City/Village"], patients["Gender"]))))
+
+
+def timed_requests(call, n, warmup=5):
+    """(first call ms, per-request latencies in ms, seconds for the n timed calls)."""
+    start = time.perf_counter()
+    call(0)
+    first_ms = (time.perf_counter() - start) * 1000
+    for i in range(warmup):
+        call(i)
+    latencies = []
+    total = time.perf_counter()
+    for i in range(n):
+        start = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return first_ms, np.array(latencies), time.perf_counter() - total
+
+
+def child(size, n_requests, seed):
+    """Run inside a fresh interpreter: set up one data size, drive every route, print JSON."""
+    workdir = tempfile.mkdtemp(prefix=f"mediai-routes-{size}-")
+    try:
+        run_routes(workdir, size, n_requests, seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_routes(workdir, size, n_requests, seed):
+    start = time.perf_counter()
+    prepare(workdir, size, seed)
+    setup_s = time.perf_counter() - start
+
+    os.chdir(workdir)
+    import app
+    import utils
+    flask_app = app.app
+    flask_app.config['TESTING'] = True
+
+    rng = np.random.default_rng(seed)
+    patient_ids = [str(1901 + i) for i in rng.integers(0, size, 64)]
+    patients = [utils.get_patient_by_id(pid) for pid in patient_ids]
+    cities, specializations = utils.get_doctor_search_options()
+
+    def client_with(**session_values):
+        client = flask_app.test_client()
+        with client.session_transaction() as s:
+            s.update(session_values)
+        return client
+
+    anonymous = flask_app.test_client()
+    admin = client_with(logged_in=True, usertype='admin', username='Administrator')
+    patient_clients = [client_with(logged_in=True, usertype='patient', username=p['Name'], patient_id=p['Patient ID'])
+                       for p in patients]
+
+    def check(response, *ok):
+        if response.status_code not in (ok or (200,)):
+            raise RuntimeError(f"{response.request.path}: HTTP {response.status_code}")
+
+    def login(i):
+        p = patients[i % len(patients)]
+        check(anonymous.post('/login', data={'username': p['Patient ID'], 'password': p['Contact'],
+                                             'usertype': 'patient'}), 302)
+
+    def register(i):
+        check(anonymous.post('/register', data={'name': f'Bench {i}', 'age': 40, 'gender': 'Female',
+                                                'blood_group': 'O+', 'contact': str(7000000000 + i),
+                                                'city_village': cities[i % len(cities)]}), 302)
+
+    def dashboard(i):
+        page = 1 + i % 20
+        check(admin.get(f'/dashboard?page={page}&sort=Name&order={"desc" if i % 2 else "asc"}'))
+
+    def patient_dashboard(i):
+        check(patient_clients[i % len(patient_clients)].get('/patient_dashboard'))
+
+    def result(i):
+        # Vary the vitals so the prediction cache does not answer every request
+        form = dict(FORM, bp_sys=100 + i % 97, glucose=70 + i % 150)
+        check(patient_clients[i % len(patient_clients)].post('/result', data=form))
+
+    def find_doctor(i):
+        check(admin.post('/find_doctor', data={'city': cities[i % len(cities)],
+                                               'specialization': specializations[i % len(specializations)]}))
+
+    def analytics(i):
+        check(admin.get('/admin/analytics'))
+
+    routes = {}
+    for name, call in [('/login', login), ('/register', register), ('/dashboard', dashboard),
+                       ('/patient_dashboard', patient_dashboard), ('/result', result), ('/find_doctor', find_doctor),
+                       ('/admin/analytics', analytics)]:
+        first_ms, latencies, elapsed = timed_requests(call, n_requests)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        routes[name] = {"first_ms": round(first_ms, 3), "p50_ms": round(p50, 3), "p95_ms": round(p95, 3),
+                        "p99_ms": round(p99, 3), "mean_ms": round(float(latencies.mean()), 3),
+                        "throughput_rps": round(n_requests / elapsed, 1), "requests": n_requests}
+    print(json.dumps({"setup_s": round(setup_s, 2), "routes": routes}))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print latency ratios against a baseline file; True if nothing regressed beyond tolerance."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}), tolerance {tolerance:.0%}")
+    ok = True
+    for size, current in results["sizes"].items():
+        before = baseline.get("sizes", {}).get(size)
+        if before is None:
+            continue
+        for route, stats in current["routes"].items():
+            old = before["routes"].get(route)
+            if old is None:
+                continue
+            ratios = {k: stats[k] / old[k] if old[k] else 1.0 for k in ("p50_ms", "p95_ms")}
+            regressed = any(r > 1 + tolerance for r in ratios.values())
+            ok = ok and not regressed
+            print(f"{size:>8} {route:<20} p50 x{ratios['p50_ms']:.2f}  p95 x{ratios['p95_ms']:.2f}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "bench_routes.json"))
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50/p95 slowdown for --compare")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.requests, args.seed)
+        return
+
+    results = {"commit": git_commit(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+               "requests": args.requests, "sizes": {}}
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    for size in args.sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", str(size),
+               "--requests", str(args.requests), "--seed", str(args.seed)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            sys.stderr.write(out.stderr)
+            raise SystemExit(f"Benchmark at {size} rows failed.")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        results["sizes"][str(size)] = result
+
+        print(f"\n{size} patients / {size} history rows (setup {result['setup_s']:.1f}s)")
+        print(f"{'route':<20} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for route, s in result["routes"].items():
+            print(f"{route:<20} {s['first_ms']:>9.1f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+                  f"{s['p99_ms']:>8.2f} {s['throughput_rps']:>8.1f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {args.out}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
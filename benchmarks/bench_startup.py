@@ -0,0 +1,128 @@
+"""Cold-start time and per-worker memory for each model loading mode (Linux only).
+
+Usage: python benchmarks/bench_startup.py [--workers 4]
+
+Simulates gunicorn with os.fork(): without --preload every worker imports
+app.py (and loads the model) after the fork; with --preload the master
+imports it once and the workers share its pages copy-on-write. Memory is
+read from /proc/<pid>/smaps_rollup once all workers have scored a row:
+RSS, PSS (shared pages split between processes) and Private (pages only
+that worker holds).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SAMPLE = {'age': 50, 'gender': 'Male', 'bmi': 30, 'bp_sys': 150, 'bp_dia': 95, 'glucose': 100, 'chol': 200,
+          'smoking': 'Never', 'alcohol': 'None', 'activity': 'Low', 'diet': 'Poor', 'sleep': 7,
+          'family_history': 'Hypertension'}
+
+
+def memory_kb():
+    """RSS, PSS and private memory of this process in kB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def import_app():
+    start = time.perf_counter()
+    import app
+    elapsed = time.perf_counter() - start
+    from preprocessing import row_to_features
+    app.score_features(row_to_features(app.current_model().tables, SAMPLE))
+    return elapsed
+
+
+def child(workers, preload):
+    """Run inside a fresh interpreter: fork `workers` processes and report their numbers as JSON."""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    master_import = import_app() if preload else None
+
+    ready_r, ready_w = os.pipe()
+    go_r, go_w = os.pipe()
+    exit_r, exit_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(ready_r)
+                os.close(go_w)
+                os.close(exit_w)
+                cold = master_import if preload else import_app()
+                os.write(ready_w, b"r")
+                os.read(go_r, 1)  # measure only once every worker is up
+                result = dict(memory_kb(), cold_start_s=cold)
+                os.write(ready_w, (json.dumps(result) + "\n").encode())
+                os.read(exit_r, 1)  # stay alive until everyone has measured (EOF)
+                status = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    os.close(ready_w)
+    os.close(go_r)
+    os.close(exit_r)
+    with os.fdopen(ready_r, "rb") as ready:
+        ready.read(workers)
+        os.write(go_w, b"g" * workers)
+        results = [json.loads(ready.readline()) for _ in range(workers)]
+        os.close(exit_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    print(json.dumps(results))
+
+
+def run(engine, preload, workers):
+    env = dict(os.environ, MEDIAI_INFERENCE_ENGINE=engine, PYTHONWARNINGS="ignore")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--workers", str(workers)]
+    if preload:
+        cmd.append("--preload")
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--preload", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.workers, args.preload)
+        return
+
+    print(f"{args.workers} workers | cold start = import app + load model | memory per worker (MB)")
+    print(f"{'mode':<28} {'cold start':>10} {'RSS':>8} {'PSS':>8} {'Private':>8}")
+    for engine in ("sklearn", "compiled"):
+        for preload in (False, True):
+            results = run(engine, preload, args.workers)
+            n = len(results)
+            cold = sum(r["cold_start_s"] for r in results) / n
+            rss, pss, private = (sum(r[k] for r in results) / n / 1024 for k in ("rss_kb", "pss_kb", "private_kb"))
+            mode = f"{engine}{' + preload' if preload else ''}"
+            print(f"{mode:<28} {cold:>9.2f}s {rss:>8.1f} {pss:>8.1f} {private:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Stress the storage write path from N concurrent processes and check no records are lost.
+
+Usage: python benchmarks/stress_concurrent_writes.py [--workers 1 2 4 8] [--per-worker 500]
+
+Each worker registers patients (allocate_patient_id + add_patient) and saves
+one prediction per patient, like gunicorn workers serving /register and
+/result. Afterwards patients.csv and the history store are checked for
+missing, duplicated or torn rows. --legacy also runs the old unlocked
+read-concat-rewrite add_patient for comparison.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def _worker(args):
+    workdir, worker_id, n, legacy = args
+    os.chdir(workdir)  # utils keeps its files under ./data
+    sys.path.insert(0, ROOT)
+    import utils
+
+    torn_reads = 0
+    start = time.perf_counter()
+    for i in range(n):
+        if legacy:
+            # Old add_patient: read everything, concat one row, rewrite the file (no lock)
+            patient_id = f"{worker_id}-{i}"
+            try:
+                df = pd.read_csv(utils.PATIENTS_FILE)
+            except (pd.errors.EmptyDataError, pd.errors.ParserError):
+                torn_reads += 1  # another worker was halfway through rewriting the file
+                continue
+            df = pd.concat([df, pd.DataFrame([{"Patient ID": patient_id, "Name": f"W{worker_id}P{i}"}])], ignore_index=True)
+            df.to_csv(utils.PATIENTS_FILE, index=False)
+            continue
+        patient_id = utils.allocate_patient_id()
+        utils.add_patient({
+            "Patient ID": patient_id, "Name": f"W{worker_id}P{i}", "Age": "40", "Gender": "Female",
+            "Blood Group": "O+", "Contact": "9000000000", "City/Village": "Guntur", "Medical History": ""
+        })
+        utils.save_prediction(patient_id, "Healthy", 90.0, inputs="stress")
+    return time.perf_counter() - start, torn_reads
+
+
+def run(workers, per_worker, legacy):
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "data"))
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            results = pool.map(_worker, [(workdir, w, per_worker, legacy) for w in range(workers)])
+        # Workers start together; the slowest loop bounds throughput (process start-up excluded)
+        elapsed = max(r[0] for r in results)
+        torn_reads = sum(r[1] for r in results)
+
+        expected = workers * per_worker
+        patients = pd.read_csv(os.path.join(workdir, "data", "patients.csv"), dtype=str)
+        lost = expected - len(patients)
+        duplicates = int(patients["Patient ID"].duplicated().sum())
+        history = None
+        if not legacy:
+            sys.path.insert(0, ROOT)
+            from history_store import HistoryStore
+            history = HistoryStore(os.path.join(workdir, "data", "history.db")).count()
+        return elapsed, expected, lost, duplicates, history, torn_reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--per-worker", type=int, default=500)
+    parser.add_argument("--legacy", action="store_true", help="also run the old unlocked rewrite path")
+    args = parser.parse_args()
+
+    modes = [False, True] if args.legacy else [False]
+    for legacy in modes:
+        print("Legacy unlocked rewrite" if legacy else "Locked append + SQLite history")
+        for workers in args.workers:
+            elapsed, expected, lost, duplicates, history, torn_reads = run(workers, args.per_worker, legacy)
+            if legacy:
+                note = f", torn reads {torn_reads}"
+            else:
+                note = f", history rows {history}/{expected}"
+            print(f"  {workers} worker(s): {expected / elapsed:8.0f} registrations/s, "
+                  f"lost {lost}, duplicate IDs {duplicates}{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Streaming bulk import of patients and CSV/JSON export of patients and history.
+
+An import reads the uploaded CSV IMPORT_CHUNK_ROWS rows at a time. Each
+chunk is validated row by row, given a block of consecutive Patient IDs with
+one counter update (IdAllocator.allocate(count)) and appended to the patients
+table in one write, so a screening camp of thousands of people costs a few
+writes instead of one full read and rewrite of patients.csv per person.
+Patients already registered (same name and contact) are skipped, so a
+failed import can simply be run again.
+
+Exports are generators of text for a streaming response (or a file) that
+read their source a chunk at a time, so memory stays flat however large the
+tables grow.
+
+Usage:
+    python bulk_io.py import camp.csv
+    python bulk_io.py export history --format json -o history.json
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+
+import pandas as pd
+
+# Rows validated, allocated and written together
+IMPORT_CHUNK_ROWS = 5000
+# Rows read per chunk when exporting
+EXPORT_CHUNK_ROWS = 5000
+# Rejected rows listed in an import report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+# Accepted CSV headers (lowercased, "_" as " ") for each patients column; Patient ID is always allocated
+IMPORT_HEADERS = {
+    "name": "Name",
+    "age": "Age",
+    "gender": "Gender",
+    "blood group": "Blood Group",
+    "contact": "Contact",
+    "city/village": "City/Village",
+    "city village": "City/Village",
+    "city": "City/Village",
+    "village": "City/Village",
+    "medical history": "Medical History",
+}
+REQUIRED_FIELDS = ["Name", "Age", "Gender", "Contact"]
+
+GENDERS = {"male": "Male", "m": "Male", "female": "Female", "f": "Female", "other": "Other"}
+BLOOD_GROUPS = {"A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"}
+MAX_AGE = 120
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "json": "application/json"}
+
+
+def validate_patient(row):
+    """(patient dict, None) for a valid import row, or (None, reason)."""
+    patient = {column: str(row.get(column, "")).strip() for column in set(IMPORT_HEADERS.values())}
+    missing = [field for field in REQUIRED_FIELDS if not patient[field]]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    if not patient["Age"].isdigit() or int(patient["Age"]) > MAX_AGE:
+        return None, f"invalid Age '{patient['Age']}'"
+    patient["Age"] = str(int(patient["Age"]))
+    gender = GENDERS.get(patient["Gender"].lower())
+    if gender is None:
+        return None, f"invalid Gender '{patient['Gender']}'"
+    patient["Gender"] = gender
+    if patient["Blood Group"]:
+        patient["Blood Group"] = patient["Blood Group"].upper().replace(" ", "")
+        if patient["Blood Group"] not in BLOOD_GROUPS:
+            return None, f"invalid Blood Group '{patient['Blood Group']}'"
+    digits = patient["Contact"].replace(" ", "").replace("-", "")
+    if not digits.lstrip("+").isdigit():
+        return None, f"invalid Contact '{patient['Contact']}'"
+    patient["Contact"] = digits
+    return patient, None
+
+
+def read_import_chunks(source, chunk_rows=IMPORT_CHUNK_ROWS):
+    """DataFrames of text cells with columns renamed to the patients table's, from a CSV path or file object."""
+    for chunk in pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True,
+                             chunksize=chunk_rows):
+        names = {column: IMPORT_HEADERS.get(str(column).strip().lower().replace("_", " ")) for column in chunk.columns}
+        missing = [field for field in REQUIRED_FIELDS if field not in names.values()]
+        if missing:
+            raise ValueError(f"CSV has no {', '.join(missing)} column")
+        yield chunk[[c for c in chunk.columns if names[c]]].rename(columns=names)
+
+
+def import_patients(source, registry, allocate_ids, add_patients, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Validate and add every patient in a CSV.
+
+    `allocate_ids(count)` returns new Patient IDs and `add_patients(records)`
+    appends them (see utils). Returns a report dict: imported, skipped
+    (already registered), rejected, the first and last new IDs and up to
+    MAX_REPORTED_ERRORS {"line", "error"} entries (line numbers count the header as 1).
+    """
+    report = {"imported": 0, "skipped": 0, "rejected": 0, "first_id": None, "last_id": None, "errors": []}
+    seen = set()
+    line = 1
+    for chunk in read_import_chunks(source, chunk_rows):
+        valid = []
+        for row in chunk.to_dict("records"):
+            line += 1
+            patient, error = validate_patient(row)
+            if error is not None:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line, "error": error})
+                continue
+            key = (patient["Name"].lower(), patient["Contact"])
+            if key in seen or registry.login(patient["Name"], patient["Contact"]) is not None:
+                report["skipped"] += 1
+                continue
+            seen.add(key)
+            valid.append(patient)
+        if not valid:
+            continue
+
+        for patient, patient_id in zip(valid, allocate_ids(len(valid))):
+            patient["Patient ID"] = patient_id
+        add_patients(valid)
+        report["imported"] += len(valid)
+        report["first_id"] = report["first_id"] or valid[0]["Patient ID"]
+        report["last_id"] = valid[-1]["Patient ID"]
+    return report
+
+
+def _csv_text(columns, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _json_text(columns, chunks):
+    # One JSON array, written a chunk of objects at a time
+    separator = "[\n"
+    for rows in chunks:
+        if rows:
+            yield separator + ",\n".join(json.dumps(dict(zip(columns, row))) for row in rows)
+            separator = ",\n"
+    yield "[]\n" if separator == "[\n" else "\n]\n"
+
+
+def export_text(columns, chunks, fmt):
+    """Text pieces of a CSV or JSON document for lists of row tuples in `columns` order."""
+    if fmt == "csv":
+        return _csv_text(columns, chunks)
+    if fmt == "json":
+        return _json_text(columns, chunks)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def patient_chunks(storage, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Lists of patient row tuples in `columns` order, read a chunk at a time."""
+    for chunk in storage.iter_chunks(chunk_rows):
+        yield list(chunk.reindex(columns=columns, fill_value="").itertuples(index=False, name=None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="add the patients in a CSV file")
+    import_parser.add_argument("path")
+    export_parser = commands.add_parser("export", help="write a table as CSV or JSON")
+    export_parser.add_argument("table", choices=["patients", "history"])
+    export_parser.add_argument("--format", choices=sorted(EXPORT_MIMETYPES), default="csv")
+    export_parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    import utils
+
+    if args.command == "import":
+        report = utils.import_patients(args.path)
+        print(f"Imported {report['imported']} patients (IDs {report['first_id']}-{report['last_id']}), "
+              f"skipped {report['skipped']} already registered, rejected {report['rejected']}.")
+        for error in report["errors"]:
+            print(f"  line {error['line']}: {error['error']}")
+        return
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for text in utils.export_table(args.table, args.format):
+            out.write(text)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
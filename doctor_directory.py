@@ -0,0 +1,164 @@
+"""In-memory doctor directory indexed by (Hospital Location, Doctor Specialization).
+
+The dataset is parsed once and grouped into row-position indexes, and the
+dropdown options are computed at load. Searches are dictionary lookups; the
+file is re-read only when its (mtime, size) changes.
+
+Doctors are ranked by a weighted score of Rating, Doctor Experience (Years)
+and Patient Count (each min-max scaled over the dataset); one sort at load
+turns it into a tie-free rank. The TOP_K best per (city, specialization) and
+per specialization are then picked with argpartition, so recommendations are
+a lookup; search pages select only the rows up to the requested page the
+same way.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+CITY_COLUMN = 'Hospital Location'
+SPECIALIZATION_COLUMN = 'Doctor Specialization'
+
+# Share of each column in the ranking score
+RANK_WEIGHTS = {'Rating': 0.6, 'Doctor Experience (Years)': 0.25, 'Patient Count': 0.15}
+
+# Doctors precomputed per (city, specialization) for recommendations
+TOP_K = 5
+
+# Specializations to consult for each predicted TargetLabel, in order of preference
+DISEASE_SPECIALIZATIONS = {
+    'Asthma': ['General Physician', 'ENT Specialist'],
+    'Diabetes': ['General Physician'],
+    'HeartDisease': ['Cardiologist'],
+    'Hypertension': ['Cardiologist', 'General Physician'],
+    'KidneyDisease': ['General Physician'],
+    'LiverDisease': ['General Physician'],
+    'StrokeRisk': ['Neurologist', 'Cardiologist'],
+}
+
+
+def read_doctor_csv(path):
+    """Read the doctor dataset, falling back to latin1 for legacy encodings."""
+    try:
+        return pd.read_csv(path, encoding='utf-8')
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding='latin1')
+
+
+class _DoctorIndex:
+    """One immutable snapshot of the dataset and its indexes."""
+
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        self.df = df
+        # groupby(...).indices -> {key: array of row positions}; rows with NaN keys are dropped
+        self.by_pair = df.groupby([CITY_COLUMN, SPECIALIZATION_COLUMN], sort=False).indices
+        self.by_city = df.groupby(CITY_COLUMN, sort=False).indices
+        self.by_specialization = df.groupby(SPECIALIZATION_COLUMN, sort=False).indices
+        self.all = np.arange(len(df))
+        self.cities = sorted(self.by_city.keys())
+        self.specializations = sorted(self.by_specialization.keys())
+
+        # rank[i] = place of row i in the overall ranking (0 = best); ties keep file order,
+        # so every selection below is deterministic and pages never overlap
+        score = np.zeros(len(df))
+        for column, weight in RANK_WEIGHTS.items():
+            if column in df.columns:
+                values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+                low, high = np.nanmin(values, initial=np.inf), np.nanmax(values, initial=-np.inf)
+                if high > low:
+                    score += weight * np.nan_to_num((values - low) / (high - low))
+        self.rank = np.empty(len(df), dtype=np.intp)
+        self.rank[np.argsort(-score, kind='stable')] = np.arange(len(df))
+
+        self.top_by_pair = {key: self.best(rows, TOP_K) for key, rows in self.by_pair.items()}
+        self.top_by_specialization = {key: self.best(rows, TOP_K) for key, rows in self.by_specialization.items()}
+
+    def best(self, rows, n):
+        """The n best-ranked of the given row positions, best first (partial selection, no full sort)."""
+        if len(rows) > n:
+            rows = rows[np.argpartition(self.rank[rows], n - 1)[:n]]
+        return rows[np.argsort(self.rank[rows])]
+
+    def positions(self, city=None, specialization=None):
+        empty = np.arange(0)
+        if city and specialization:
+            return self.by_pair.get((city, specialization), empty)
+        if city:
+            return self.by_city.get(city, empty)
+        if specialization:
+            return self.by_specialization.get(specialization, empty)
+        return self.all
+
+
+class DoctorDirectory:
+    """Cached doctor dataset with precomputed search indexes and dropdown options."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._index = None
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def index(self):
+        """Current index snapshot, rebuilt if the dataset changed since the last load."""
+        signature = self._file_signature()
+        if self._index is not None and signature == self._signature:
+            return self._index
+        with self._lock:
+            if self._index is None or signature != self._signature:
+                if signature is None:
+                    df = pd.DataFrame(columns=[CITY_COLUMN, SPECIALIZATION_COLUMN])
+                else:
+                    df = read_doctor_csv(self.path)
+                self._index = _DoctorIndex(df)
+                self._signature = signature
+            return self._index
+
+    def options(self):
+        """(cities, specializations) for the search dropdowns."""
+        index = self.index()
+        return list(index.cities), list(index.specializations)
+
+    def search(self, city=None, specialization=None, page=1, per_page=20):
+        """(records, total): one page of the doctors matching the filters (None/empty means no filter), best first."""
+        index = self.index()
+        rows = index.positions(city, specialization)
+        start = (page - 1) * per_page
+        if start >= len(rows):
+            return [], len(rows)
+        page_rows = index.best(rows, start + per_page)[start:]
+        return index.df.take(page_rows).to_dict('records'), len(rows)
+
+    def recommend(self, disease, city=None, k=TOP_K):
+        """(specialization, doctor records, in_city) for a predicted disease.
+
+        Uses the first specialization for the disease with doctors in `city`;
+        without a city, or with none there, the best of the first specialization
+        anywhere. (None, [], False) for diseases with no specialist (e.g. Healthy).
+        """
+        index = self.index()
+        specializations = [s for s in DISEASE_SPECIALIZATIONS.get(disease, []) if s in index.by_specialization]
+        if not specializations:
+            return None, [], False
+
+        for specialization in specializations if city else []:
+            rows = index.top_by_pair.get((city, specialization))
+            if rows is not None:
+                if k > TOP_K:
+                    rows = index.best(index.by_pair[(city, specialization)], k)
+                return specialization, index.df.take(rows[:k]).to_dict('records'), True
+
+        specialization = specializations[0]
+        rows = index.top_by_specialization[specialization]
+        if k > TOP_K:
+            rows = index.best(index.by_specialization[specialization], k)
+        return specialization, index.df.take(rows[:k]).to_dict('records'), False
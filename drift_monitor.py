@@ -0,0 +1,227 @@
+"""Streaming drift monitor: live /result inputs vs. the model's training distribution.
+
+Every prediction adds its inputs to running statistics in O(1): a Welford
+mean and variance for each numeric feature and a count per value for each
+categorical feature. Those are per-process deltas. Every MERGE_SECONDS a
+worker folds its deltas into shared totals in SQLite (data/state.db) in one
+short write transaction. The merge is the parallel form of Welford's update,
+computed inside an upsert, so the totals equal what one process would have
+seen. The hot path only touches a few floats and dict entries, and it never
+does I/O except on the merging request.
+
+report() compares the totals with the training statistics. Numeric features
+are checked against the mean and variance stored in the fitted scaler; the
+drift score is the shift of the live mean in training standard deviations,
+plus the variance ratio. Categorical features are checked against the
+encoder's category set; the score is the share of live values that fall back
+to the unknown code.
+"""
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from preprocessing import CATEGORICAL_FIELDS, FIELD_NAMES
+
+NUMERIC_FIELDS = [field for field in FIELD_NAMES if field not in CATEGORICAL_FIELDS]
+
+# Seconds between merges of a worker's statistics into the shared state
+MERGE_SECONDS = 10.0
+# Distinct unknown values counted by name per feature and process; the rest are lumped together
+MAX_UNKNOWN_VALUES = 20
+OTHER_VALUE = "(other)"
+
+# A feature is flagged once it has MIN_OBSERVATIONS and its score passes the threshold
+MIN_OBSERVATIONS = 30
+MEAN_SHIFT_THRESHOLD = 0.5  # training standard deviations
+VARIANCE_RATIO_RANGE = (0.5, 2.0)
+UNKNOWN_RATE_THRESHOLD = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drift_numeric (
+    feature TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL  -- sum of squared differences from the mean (Welford)
+);
+CREATE TABLE IF NOT EXISTS drift_categories (
+    feature TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (feature, value)
+) WITHOUT ROWID;
+"""
+
+# Chan et al.'s pairwise combination of (count, mean, m2); SET expressions all see the old row
+MERGE_NUMERIC = """
+INSERT INTO drift_numeric (feature, count, mean, m2) VALUES (?, ?, ?, ?)
+ON CONFLICT(feature) DO UPDATE SET
+    mean = mean + (excluded.mean - mean) * excluded.count / (count + excluded.count),
+    m2 = m2 + excluded.m2 + (excluded.mean - mean) * (excluded.mean - mean) * count * excluded.count / (count + excluded.count),
+    count = count + excluded.count
+"""
+MERGE_CATEGORY = """
+INSERT INTO drift_categories (feature, value, count) VALUES (?, ?, ?)
+ON CONFLICT(feature, value) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def training_stats(scaler, tables):
+    """Training mean/variance per numeric field (from the fitted scaler) and category set per categorical field."""
+    numeric = {}
+    for field in NUMERIC_FIELDS:
+        # The scaler's columns are in FIELD_NAMES order (see preprocessing.FEATURE_COLUMNS)
+        i = FIELD_NAMES.index(field)
+        numeric[field] = (float(scaler.mean_[i]), float(scaler.var_[i]))
+    categories = {field: sorted(tables.get(encoder, {})) for field, encoder in CATEGORICAL_FIELDS.items()}
+    return numeric, categories
+
+
+def load_training_stats(directory, tables):
+    """training_stats() of a model version directory (every version ships its fitted scaler)."""
+    import joblib
+    from model_registry import SCALER_FILE
+    return training_stats(joblib.load(os.path.join(directory, SCALER_FILE)), tables)
+
+
+class DriftMonitor:
+    """Running input statistics, merged across processes through a SQLite file."""
+
+    def __init__(self, path, merge_seconds=MERGE_SECONDS):
+        self.path = path
+        self.merge_seconds = merge_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = self._empty()
+        self._next_merge = time.monotonic() + merge_seconds
+        self._connect().executescript(SCHEMA)
+        atexit.register(self.merge)
+
+    def _connect(self):
+        """One connection per thread and per process (gunicorn forks after import)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _empty():
+        # Per numeric field [count, mean, m2]; per categorical field {value: count}
+        return {"numeric": {field: [0, 0.0, 0.0] for field in NUMERIC_FIELDS},
+                "categories": {field: {} for field in CATEGORICAL_FIELDS}}
+
+    def observe(self, values, tables):
+        """Add one prediction's inputs (form field -> value); `tables` are the serving encoder tables."""
+        with self._lock:
+            pending = self._pending
+            for field in NUMERIC_FIELDS:
+                try:
+                    x = float(values[field])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                stats = pending["numeric"][field]
+                stats[0] += 1
+                delta = x - stats[1]
+                stats[1] += delta / stats[0]
+                stats[2] += delta * (x - stats[1])
+            for field, encoder in CATEGORICAL_FIELDS.items():
+                value = str(values.get(field, ""))
+                counts = pending["categories"][field]
+                table = tables.get(encoder, {})
+                # Known categories are bounded by the encoder; unknown ones are capped
+                if value not in counts and value not in table and len(counts) >= len(table) + MAX_UNKNOWN_VALUES:
+                    value = OTHER_VALUE
+                counts[value] = counts.get(value, 0) + 1
+            due = time.monotonic() >= self._next_merge
+        if due:
+            self.merge()
+
+    def merge(self):
+        """Fold this process's statistics into the shared state."""
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+            self._next_merge = time.monotonic() + self.merge_seconds
+        numeric = [(field, n, mean, m2) for field, (n, mean, m2) in pending["numeric"].items() if n]
+        categories = [(field, value, n) for field, counts in pending["categories"].items() for value, n in counts.items()]
+        if not numeric and not categories:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(MERGE_NUMERIC, numeric)
+            conn.executemany(MERGE_CATEGORY, categories)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reset(self):
+        """Drop all statistics, e.g. after publishing a model trained on new data.
+
+        Other workers' unmerged statistics (at most MERGE_SECONDS' worth) still arrive afterwards.
+        """
+        with self._lock:
+            self._pending = self._empty()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM drift_numeric")
+            conn.execute("DELETE FROM drift_categories")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def report(self, training):
+        """Live statistics and drift scores per feature against `training` (see training_stats).
+
+        Only statistics already merged by every worker are included; this
+        process's own are merged first.
+        """
+        self.merge()
+        conn = self._connect()
+        train_numeric, train_categories = training
+        features = {}
+
+        live = {row[0]: row[1:] for row in conn.execute("SELECT feature, count, mean, m2 FROM drift_numeric")}
+        for field in NUMERIC_FIELDS:
+            train_mean, train_var = train_numeric[field]
+            count, mean, m2 = live.get(field, (0, None, 0.0))
+            entry = {"count": count, "train_mean": round(train_mean, 4), "train_std": round(math.sqrt(train_var), 4),
+                     "mean": None, "std": None, "mean_shift": None, "variance_ratio": None, "drift": False}
+            if count:
+                var = m2 / count  # population variance, like the scaler's var_
+                shift = (mean - train_mean) / math.sqrt(train_var) if train_var > 0 else 0.0
+                ratio = var / train_var if train_var > 0 else None
+                entry.update(mean=round(mean, 4), std=round(math.sqrt(var), 4), mean_shift=round(shift, 4),
+                             variance_ratio=round(ratio, 4) if ratio is not None else None)
+                entry["drift"] = count >= MIN_OBSERVATIONS and (
+                    abs(shift) > MEAN_SHIFT_THRESHOLD or
+                    (ratio is not None and not VARIANCE_RATIO_RANGE[0] <= ratio <= VARIANCE_RATIO_RANGE[1]))
+            features[field] = entry
+
+        counts = {field: {} for field in CATEGORICAL_FIELDS}
+        for field, value, n in conn.execute("SELECT feature, value, count FROM drift_categories ORDER BY count DESC"):
+            if field in counts:
+                counts[field][value] = n
+        for field in CATEGORICAL_FIELDS:
+            known = set(train_categories[field])
+            total = sum(counts[field].values())
+            unknown = sum(n for value, n in counts[field].items() if value not in known)
+            rate = unknown / total if total else None
+            features[field] = {
+                "count": total, "train_categories": train_categories[field], "frequencies": counts[field],
+                "unknown_rate": round(rate, 4) if rate is not None else None,
+                "drift": total >= MIN_OBSERVATIONS and rate > UNKNOWN_RATE_THRESHOLD,
+            }
+
+        drifting = [field for field in FIELD_NAMES if features[field]["drift"]]
+        observations = max([features[field]["count"] for field in FIELD_NAMES] or [0])
+        return {"observations": observations, "drifting": drifting,
+                "features": {field: features[field] for field in FIELD_NAMES}}
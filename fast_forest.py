@@ -0,0 +1,334 @@
+"""Array-compiled inference for the unified RandomForest.
+
+The fitted forest is flattened into plain NumPy arrays (feature, threshold,
+left/right child, leaf probabilities) and all trees are walked together, so a
+single row costs a few dozen vectorized steps instead of 100 sklearn calls.
+
+The StandardScaler is folded into the split thresholds: every split
+``float32((x - mean) / scale) <= t`` is rewritten as ``x <= raw_t`` where
+``raw_t`` is the largest float64 for which the original test holds. The scaled
+value is monotonic in ``x``, so both tests agree for every finite input and
+the output is bit-identical to ``scaler.transform`` + ``model.predict_proba``.
+
+The arrays can be saved as plain ``.npy`` files and memory-mapped back, so
+gunicorn workers share one copy of the forest through the page cache and
+serving needs neither sklearn nor an unpickle at startup.
+
+Run ``python fast_forest.py`` to check parity on datasets/disease_dataset.csv,
+or ``python fast_forest.py --export`` to write models/unified_compiled/.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Rows are walked in chunks to bound the (rows x trees) working arrays
+CHUNK_ROWS = 4096
+
+# Arrays written by CompiledForest.save (one .npy file each)
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'missing_left', 'leaf_proba', 'roots']
+
+_SIGN_BIT = np.uint64(1 << 63)
+
+
+def _ordered_keys(values):
+    """Map float64 values to uint64 keys with the same ordering."""
+    bits = values.view(np.uint64)
+    return np.where(bits & _SIGN_BIT, ~bits, bits | _SIGN_BIT)
+
+
+def _from_ordered_keys(keys):
+    """Inverse of _ordered_keys."""
+    bits = np.where(keys & _SIGN_BIT, keys & ~_SIGN_BIT, ~keys)
+    return bits.view(np.float64)
+
+
+def fold_thresholds(thresholds, mean, scale):
+    """Find raw-space thresholds equivalent to ``float32((x - mean) / scale) <= thresholds``."""
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def holds(x):
+        # Same arithmetic as StandardScaler.transform followed by the tree's float32 cast
+        with np.errstate(over='ignore'):
+            scaled = ((x - mean) / scale).astype(np.float32)
+        return scaled.astype(np.float64) <= thresholds
+
+    # Bracket: -max float always satisfies the split, +max float never does
+    finfo = np.finfo(np.float64)
+    lo = _ordered_keys(np.full(thresholds.shape, -finfo.max))
+    hi = _ordered_keys(np.full(thresholds.shape, finfo.max))
+
+    # Binary search over the ordered float64 bit patterns (at most 64 rounds)
+    one = np.uint64(1)
+    while True:
+        open_ = (hi - lo) > one
+        if not open_.any():
+            break
+        mid = lo + (hi - lo) // np.uint64(2)
+        ok = holds(_from_ordered_keys(mid))
+        lo = np.where(open_ & ok, mid, lo)
+        hi = np.where(open_ & ~ok, mid, hi)
+
+    return _from_ordered_keys(lo)
+
+
+class CompiledForest:
+    """Flat-array RandomForestClassifier (optionally with its StandardScaler folded in)."""
+
+    def __init__(self, classes, max_depth, **arrays):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self.n_classes = len(self.classes_)
+        self.max_depth = int(max_depth)
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.n_trees = len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None, classes=None):
+        """Flatten a fitted RandomForestClassifier, folding in an optional StandardScaler.
+
+        A multi-output RandomForestRegressor fitted on class probabilities
+        (a distilled forest, see train_models.py) works too, given its `classes`.
+        """
+        classes = model.classes_ if classes is None else np.asarray(classes, dtype=object)
+        n_classes = len(classes)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n) + offset
+
+            # Leaves point at themselves, so extra steps are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            # NaN inputs follow the tree's learned missing-value direction
+            missing.append(np.where(is_leaf, 0, tree.missing_go_to_left))
+            # Same leaf output as DecisionTreeClassifier.predict_proba; a probability
+            # regressor keeps one output per class instead
+            values.append(tree.value[:, :, 0] if tree.n_outputs > 1 else tree.value[:, 0, :n_classes])
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature = np.concatenate(features).astype(np.intp)
+        threshold = np.concatenate(thresholds).astype(np.float64)
+        if scaler is not None:
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)
+            scale = scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)
+            split = np.isfinite(threshold)
+            threshold[split] = fold_thresholds(threshold[split], mean[feature[split]], scale[feature[split]])
+
+        return cls(
+            classes, max_depth,
+            feature=feature,
+            threshold=threshold,
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing).astype(bool),
+            leaf_proba=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.array(roots, dtype=np.intp),
+        )
+
+    def compact(self):
+        """Copy with the narrowest array types: small node indexes, float32 thresholds and probabilities.
+
+        Thresholds are rounded down to float32, so a split only changes for
+        inputs within one float32 step above it.
+        """
+        index_type = np.int16 if len(self.feature) < 2 ** 15 else np.int32
+        threshold = self.threshold.astype(np.float32)
+        too_high = threshold.astype(np.float64) > self.threshold
+        threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+        return CompiledForest(
+            self.classes_, self.max_depth,
+            feature=self.feature.astype(np.uint8 if self.feature.max(initial=0) < 256 else np.int16),
+            threshold=threshold,
+            left=self.left.astype(index_type),
+            right=self.right.astype(index_type),
+            missing_left=self.missing_left,
+            leaf_proba=self.leaf_proba.astype(np.float32),
+            roots=self.roots.astype(index_type),
+        )
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def save(self, path, encoder_tables=None):
+        """Write the arrays as .npy files plus meta.json (replacing any previous export)."""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(getattr(self, name)))
+        meta = {
+            "classes": [str(c) for c in self.classes_],
+            "max_depth": self.max_depth,
+            "encoder_tables": encoder_tables or {},
+        }
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def _walk(self, X):
+        """Return the leaf index reached in every tree, shape (rows, trees)."""
+        n_rows, n_features = X.shape
+        values = X.ravel()
+        check_nan = np.isnan(values).any()
+        leaves = np.tile(self.roots, n_rows)
+        # Only (row, tree) pairs still at a split are stepped; most reach a leaf long before max_depth
+        pending = np.arange(leaves.size)
+        offset = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        node = leaves
+        for _ in range(self.max_depth):
+            if not pending.size:
+                break
+            x = values[offset + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if check_nan:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+            leaves[pending] = node
+            split = self.left[node] != node
+            pending, offset, node = pending[split], offset[split], node[split]
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def _proba(self, X):
+        leaves = self._walk(X)
+        # (trees, rows, classes): summing over axis 0 adds trees in order, like sklearn's accumulator
+        per_tree = self.leaf_proba[leaves.T]
+        proba = np.add.reduce(per_tree, axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict_proba(self, X):
+        """Class probabilities for raw (unscaled) feature rows."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._proba(X)
+        return np.concatenate([self._proba(X[i:i + CHUNK_ROWS]) for i in range(0, X.shape[0], CHUNK_ROWS)])
+
+    def score(self, X):
+        """Return (labels, probabilities) from a single pass over the forest."""
+        proba = self.predict_proba(X)
+        labels = self.classes_.take(np.argmax(proba, axis=1))
+        return labels, proba
+
+
+def compile_forest(model, scaler=None, classes=None):
+    """Compile a fitted RandomForestClassifier (and optional StandardScaler)."""
+    return CompiledForest.from_sklearn(model, scaler, classes)
+
+
+def load_compiled(path, mmap=True):
+    """Load an exported forest. Returns (engine, encoder_tables).
+
+    With mmap=True the arrays are memory-mapped read-only, so every process
+    loading the same export shares the pages instead of holding a copy.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r' if mmap else None)
+        for name in ARRAY_NAMES
+    }
+    return CompiledForest(meta["classes"], meta["max_depth"], **arrays), meta["encoder_tables"]
+
+
+def export_compiled(path="models/unified_compiled"):
+    """Compile the pickled unified model and write it in the memory-mappable format."""
+    import joblib
+    from preprocessing import build_encoder_tables
+
+    model = joblib.load("models/unified_model.pkl")
+    scaler = joblib.load("models/unified_scaler.pkl")
+    encoders = joblib.load("models/unified_encoders.pkl")
+    compile_forest(model, scaler).save(path, build_encoder_tables(encoders))
+    print(f"Compiled model exported to {path}")
+
+
+def check_parity(dataset_path="datasets/disease_dataset.csv"):
+    """Compare the compiled engine with sklearn on every row of the training dataset."""
+    import time
+    import warnings
+    import joblib
+    import pandas as pd
+    from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, build_encoder_tables, rows_to_features
+
+    model = joblib.load("models/unified_model.pkl")
+    scaler = joblib.load("models/unified_scaler.pkl")
+    encoders = joblib.load("models/unified_encoders.pkl")
+    tables = build_encoder_tables(encoders)
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    df = pd.read_csv(dataset_path, keep_default_na=False)
+    rows = df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES)))
+    X = rows_to_features(tables, rows)
+
+    start = time.perf_counter()
+    engine = compile_forest(model, scaler)
+    print(f"Compiled {engine.n_trees} trees ({len(engine.feature)} nodes) in {time.perf_counter() - start:.3f}s")
+
+    # Boundary rows: put each feature exactly on a folded threshold and one ulp above it
+    rng = np.random.default_rng(42)
+    split = np.isfinite(engine.threshold)
+    picks = rng.choice(np.flatnonzero(split), size=len(X))
+    edges = X.copy()
+    edges[np.arange(len(X)), engine.feature[picks]] = engine.threshold[picks]
+    above = edges.copy()
+    above[np.arange(len(X)), engine.feature[picks]] = np.nextafter(engine.threshold[picks], np.inf)
+    # Missing values follow each split's learned direction
+    missing = X.copy()
+    missing[rng.random(missing.shape) < 0.2] = np.nan
+    X = np.vstack([X, edges, above, missing])
+
+    expected = model.predict_proba(scaler.transform(X))
+    labels, proba = engine.score(X)
+    identical = np.array_equal(proba.view(np.uint64), expected.view(np.uint64))
+    same_labels = np.array_equal(labels, model.predict(scaler.transform(X)))
+    print(f"Rows checked: {len(X)} (incl. threshold edges, NaN) | bit-identical probabilities: {identical} | identical labels: {same_labels}")
+
+    # Exported + memory-mapped engine must agree as well
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        engine.save(os.path.join(tmp, "compiled"), tables)
+        mapped, _ = load_compiled(os.path.join(tmp, "compiled"))
+        mapped_identical = np.array_equal(mapped.predict_proba(X).view(np.uint64), expected.view(np.uint64))
+    print(f"Memory-mapped export bit-identical: {mapped_identical}")
+    identical = identical and mapped_identical
+
+    # Single-row latency, as paid by /result
+    def latencies(fn, n=300):
+        times = []
+        for i in range(n):
+            row = X[i:i + 1]
+            t0 = time.perf_counter()
+            fn(row)
+            times.append(time.perf_counter() - t0)
+        return np.percentile(np.array(times) * 1000, [50, 99])
+
+    sk_p50, sk_p99 = latencies(lambda row: model.predict_proba(scaler.transform(row)))
+    fast_p50, fast_p99 = latencies(engine.score)
+    print(f"Single row sklearn:  p50 {sk_p50:.3f} ms, p99 {sk_p99:.3f} ms")
+    print(f"Single row compiled: p50 {fast_p50:.3f} ms, p99 {fast_p99:.3f} ms")
+    return identical and same_labels
+
+
+if __name__ == "__main__":
+    import sys
+    if "--export" in sys.argv:
+        export_compiled()
+    else:
+        sys.exit(0 if check_parity() else 1)
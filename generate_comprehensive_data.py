@@ -1,129 +1,315 @@
-import pandas as pd
+"""Synthetic data for training and scale testing.
+
+Rows are sampled a chunk at a time with array operations: the target
+condition of every row is drawn first, then each condition's block of rows
+gets its features overwritten in one go, with the same per-condition
+distributions as before. Chunks are written as they are produced, so
+millions of rows never sit in memory at once.
+
+Usage:
+    python generate_comprehensive_data.py                       # datasets/disease_dataset.csv, 5000 rows
+    python generate_comprehensive_data.py disease --rows 5000000 --seed 7 --out big.csv
+    python generate_comprehensive_data.py patients --rows 1000000 --format parquet
+    python generate_comprehensive_data.py history --rows 1000000 --patients 100000
+    python generate_comprehensive_data.py doctors --rows 1000000
+"""
+import argparse
+import os
+import time
+
 import numpy as np
-import random
-
-def generate_comprehensive_dataset(n=5000):
-    np.random.seed(42)
-    random.seed(42)
-    
-    data = []
-    
-    # Diseases to simulate
-    conditions = [
-        'Healthy', 'Diabetes', 'Hypertension', 'HeartDisease', 
-        'StrokeRisk', 'KidneyDisease', 'LiverDisease', 'Asthma'
-    ]
-    
-    for _ in range(n):
-        # Base Demographics
-        age = np.random.randint(18, 90)
-        gender = np.random.choice(['Male', 'Female'])
-        
-        # Initial Random Vitals (Healthy Baseline)
-        bmi = np.random.uniform(18.5, 24.9)
-        bp_sys = np.random.randint(90, 119)
-        bp_dia = np.random.randint(60, 79)
-        glucose = np.random.randint(70, 99)
-        chol = np.random.randint(125, 199)
-        
-        # Lifestyle Factors
-        smoking = 'Never'
-        alcohol = 'None'
-        activity = 'Moderate'
-        diet = 'Good'
-        sleep = np.random.uniform(6, 9)
-        history = 'None'
-        
-        # Decide Target first, then force features to match (Synthetic Generation Strategy)
-        # This ensures strong correlations for the model to learn
-        
-        # Weighted prob for target
-        target = np.random.choice(conditions, p=[0.35, 0.1, 0.1, 0.1, 0.05, 0.1, 0.1, 0.1])
-        
-        if target == 'Healthy':
-            # Keep healthy baseline, maybe slight variations
-            if np.random.random() < 0.2: activity = 'High'
-            if np.random.random() < 0.1: alcohol = 'Moderate'
-            
-        elif target == 'Diabetes':
-            glucose = np.random.randint(130, 250) # Distinctly high
-            bmi = np.random.uniform(28, 40) # Overweight
-            history = np.random.choice(['Diabetes', 'None'], p=[0.7, 0.3])
-            diet = 'Poor'
-            activity = 'Low'
-            
-        elif target == 'Hypertension':
-            bp_sys = np.random.randint(140, 180) # Distinctly high
-            bp_dia = np.random.randint(90, 110)
-            age = max(age, 40)
-            diet = np.random.choice(['Poor', 'Good'], p=[0.7, 0.3]) # Salt?
-            history = np.random.choice(['Hypertension', 'None'], p=[0.6, 0.4])
-
-        elif target == 'HeartDisease':
-            age = max(age, 50)
-            chol = np.random.randint(240, 350)
-            bp_sys = np.random.randint(130, 160)
-            smoking = np.random.choice(['Current', 'Former'], p=[0.7, 0.3])
-            diet = 'Poor'
-            history = np.random.choice(['HeartDisease', 'None'], p=[0.6, 0.4])
-            
-        elif target == 'StrokeRisk':
-            age = max(age, 60)
-            bp_sys = np.random.randint(150, 200)
-            bmi = np.random.uniform(30, 45)
-            smoking = 'Current'
-            history = np.random.choice(['Stroke', 'None'], p=[0.5, 0.5])
-            
-        elif target == 'KidneyDisease':
-            age = max(age, 45)
-            bp_sys = np.random.randint(135, 170)
-            glucose = np.random.randint(110, 180) # Slight intersection with diabetes
-            history = 'KidneyDisease' # Strong genetic link for synthetic signal
-            
-        elif target == 'LiverDisease':
-            alcohol = 'High' # Strong signal
-            age = max(age, 35)
-            bmi = np.random.uniform(25, 35)
-            history = np.random.choice(['LiverDisease', 'None'], p=[0.4, 0.6])
-            
-        elif target == 'Asthma':
-            # Can be young
-            history = 'Asthma' # Strong signal
-            smoking = np.random.choice(['Never', 'Former', 'Current'], p=[0.6, 0.2, 0.2])
-            # Vitals usually normal unless attack, but model needs static features
-            # Maybe slight random noise in others
-            
-        # Add random noise to non-critical features to prevent overfitting
-        if np.random.random() < 0.1: smoking = np.random.choice(['Never', 'Former', 'Current'])
-        if np.random.random() < 0.1: sleep = np.random.uniform(4, 10)
-
-        row = [
-            age, gender, round(bmi, 1), int(bp_sys), int(bp_dia), int(glucose), int(chol),
-            smoking, alcohol, activity, diet, round(sleep, 1), history,
-            target
-        ]
-        data.append(row)
-        
-    columns = [
-        'Age', 'Gender', 'BMI', 'BloodPressure_Systolic', 'BloodPressure_Diastolic',
-        'Glucose_Fasting_mg_dL', 'Cholesterol_Total_mg_dL', 
-        'Smoking', 'AlcoholIntake', 'PhysicalActivity', 'DietQuality', 'SleepHours',
-        'FamilyHistory', 'TargetLabel'
-    ]
-    
-    df = pd.DataFrame(data, columns=columns)
-    
-    # Remove duplicates
-    initial_len = len(df)
-    df.drop_duplicates(inplace=True)
-    final_len = len(df)
-    
-    if initial_len > final_len:
-        print(f"Removed {initial_len - final_len} duplicate records.")
-    
-    df.to_csv("datasets/disease_dataset.csv", index=False)
-    print(f"Refined dataset generated with {final_len} unique records.")
-    print(df['TargetLabel'].value_counts())
+import pandas as pd
+
+# Diseases to simulate, with their share of rows
+CONDITIONS = [
+    'Healthy', 'Diabetes', 'Hypertension', 'HeartDisease',
+    'StrokeRisk', 'KidneyDisease', 'LiverDisease', 'Asthma'
+]
+CONDITION_PROBS = [0.35, 0.1, 0.1, 0.1, 0.05, 0.1, 0.1, 0.1]
+
+DISEASE_COLUMNS = [
+    'Age', 'Gender', 'BMI', 'BloodPressure_Systolic', 'BloodPressure_Diastolic',
+    'Glucose_Fasting_mg_dL', 'Cholesterol_Total_mg_dL',
+    'Smoking', 'AlcoholIntake', 'PhysicalActivity', 'DietQuality', 'SleepHours',
+    'FamilyHistory', 'TargetLabel'
+]
+PATIENT_COLUMNS = ['Patient ID', 'Name', 'Age', 'Gender', 'Blood Group', 'Contact', 'City/Village', 'Medical History']
+HISTORY_COLUMNS = ['Patient ID', 'Disease', 'Risk Score', 'Date', 'Inputs']
+DOCTOR_COLUMNS = ['Doctor Name', 'Doctor Specialization', 'Hospital', 'Hospital Location', 'Contact Info',
+                  'Doctor Experience (Years)', 'Rating', 'Patient Count']
+
+FIRST_NAMES = ['Santosh', 'Ravi', 'Lakshmi', 'Priya', 'Anil', 'Sunita', 'Kiran', 'Deepa', 'Suresh', 'Kavya',
+               'Ramesh', 'Anjali', 'Venkat', 'Swathi', 'Mahesh', 'Divya', 'Naveen', 'Padma', 'Arjun', 'Meena']
+SURNAMES = ['Kumar', 'Reddy', 'Rao', 'Sharma', 'Naidu', 'Varma', 'Chowdary', 'Prasad', 'Devi', 'Murthy']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+SMOKING = ['Never', 'Former', 'Current']
+
+DOCTOR_FILE = "datasets/doctor_dataset.csv"
+
+DEFAULT_CHUNK_ROWS = 100000
+
+
+def _pick(rng, values, n, p=None):
+    """n draws from a list of strings, as an object array (cheap to overwrite in place)."""
+    return np.array(values, dtype=object)[rng.choice(len(values), n, p=p)]
+
+
+def sample_disease_rows(rng, n):
+    """One chunk of labelled training rows (same distributions as the original row-by-row loop)."""
+    # Base Demographics and healthy baseline vitals
+    age = rng.integers(18, 90, n)
+    gender = _pick(rng, ['Male', 'Female'], n)
+    bmi = rng.uniform(18.5, 24.9, n)
+    bp_sys = rng.integers(90, 119, n)
+    bp_dia = rng.integers(60, 79, n)
+    glucose = rng.integers(70, 99, n)
+    chol = rng.integers(125, 199, n)
+
+    # Lifestyle Factors
+    smoking = np.full(n, 'Never', dtype=object)
+    alcohol = np.full(n, 'None', dtype=object)
+    activity = np.full(n, 'Moderate', dtype=object)
+    diet = np.full(n, 'Good', dtype=object)
+    sleep = rng.uniform(6, 9, n)
+    history = np.full(n, 'None', dtype=object)
+
+    # Decide Target first, then force each condition's block of features to match
+    target = _pick(rng, CONDITIONS, n, p=CONDITION_PROBS)
+    blocks = {name: np.flatnonzero(target == name) for name in CONDITIONS}
+
+    i = blocks['Healthy']
+    activity[i[rng.random(len(i)) < 0.2]] = 'High'
+    alcohol[i[rng.random(len(i)) < 0.1]] = 'Moderate'
+
+    i = blocks['Diabetes']
+    glucose[i] = rng.integers(130, 250, len(i))
+    bmi[i] = rng.uniform(28, 40, len(i))
+    history[i] = _pick(rng, ['Diabetes', 'None'], len(i), p=[0.7, 0.3])
+    diet[i] = 'Poor'
+    activity[i] = 'Low'
+
+    i = blocks['Hypertension']
+    bp_sys[i] = rng.integers(140, 180, len(i))
+    bp_dia[i] = rng.integers(90, 110, len(i))
+    age[i] = np.maximum(age[i], 40)
+    diet[i] = _pick(rng, ['Poor', 'Good'], len(i), p=[0.7, 0.3])
+    history[i] = _pick(rng, ['Hypertension', 'None'], len(i), p=[0.6, 0.4])
+
+    i = blocks['HeartDisease']
+    age[i] = np.maximum(age[i], 50)
+    chol[i] = rng.integers(240, 350, len(i))
+    bp_sys[i] = rng.integers(130, 160, len(i))
+    smoking[i] = _pick(rng, ['Current', 'Former'], len(i), p=[0.7, 0.3])
+    diet[i] = 'Poor'
+    history[i] = _pick(rng, ['HeartDisease', 'None'], len(i), p=[0.6, 0.4])
+
+    i = blocks['StrokeRisk']
+    age[i] = np.maximum(age[i], 60)
+    bp_sys[i] = rng.integers(150, 200, len(i))
+    bmi[i] = rng.uniform(30, 45, len(i))
+    smoking[i] = 'Current'
+    history[i] = _pick(rng, ['Stroke', 'None'], len(i), p=[0.5, 0.5])
+
+    i = blocks['KidneyDisease']
+    age[i] = np.maximum(age[i], 45)
+    bp_sys[i] = rng.integers(135, 170, len(i))
+    glucose[i] = rng.integers(110, 180, len(i))
+    history[i] = 'KidneyDisease'
+
+    i = blocks['LiverDisease']
+    alcohol[i] = 'High'
+    age[i] = np.maximum(age[i], 35)
+    bmi[i] = rng.uniform(25, 35, len(i))
+    history[i] = _pick(rng, ['LiverDisease', 'None'], len(i), p=[0.4, 0.6])
+
+    i = blocks['Asthma']
+    history[i] = 'Asthma'
+    smoking[i] = _pick(rng, SMOKING, len(i), p=[0.6, 0.2, 0.2])
+
+    # Add random noise to non-critical features to prevent overfitting
+    noisy = np.flatnonzero(rng.random(n) < 0.1)
+    smoking[noisy] = _pick(rng, SMOKING, len(noisy))
+    noisy = np.flatnonzero(rng.random(n) < 0.1)
+    sleep[noisy] = rng.uniform(4, 10, len(noisy))
+
+    return pd.DataFrame({
+        'Age': age, 'Gender': gender, 'BMI': bmi.round(1), 'BloodPressure_Systolic': bp_sys,
+        'BloodPressure_Diastolic': bp_dia, 'Glucose_Fasting_mg_dL': glucose, 'Cholesterol_Total_mg_dL': chol,
+        'Smoking': smoking, 'AlcoholIntake': alcohol, 'PhysicalActivity': activity, 'DietQuality': diet,
+        'SleepHours': sleep.round(1), 'FamilyHistory': history, 'TargetLabel': target,
+    }, columns=DISEASE_COLUMNS)
+
+
+def _chunk_sizes(rows, chunk_rows):
+    for start in range(0, rows, chunk_rows):
+        yield start, min(chunk_rows, rows - start)
+
+
+def disease_chunks(rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Training rows, duplicates removed within each chunk.
+
+    Rows repeated across chunks are kept, so with more than chunk_rows rows the
+    output can hold duplicates and its length depends on chunk_rows.
+    """
+    rng = np.random.default_rng(seed)
+    for _, n in _chunk_sizes(rows, chunk_rows):
+        yield sample_disease_rows(rng, n).drop_duplicates()
+
+
+def patient_chunks(rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, first_id=1901, cities=None):
+    """Registered patients with consecutive IDs from first_id."""
+    rng = np.random.default_rng(seed)
+    cities = cities or _doctor_cities()
+    for start, n in _chunk_sizes(rows, chunk_rows):
+        yield pd.DataFrame({
+            'Patient ID': np.arange(first_id + start, first_id + start + n),
+            'Name': _pick(rng, FIRST_NAMES, n) + ' ' + _pick(rng, SURNAMES, n),
+            'Age': rng.integers(18, 90, n),
+            'Gender': _pick(rng, ['Male', 'Female'], n),
+            'Blood Group': _pick(rng, BLOOD_GROUPS, n),
+            'Contact': rng.integers(6000000000, 9999999999, n),
+            'City/Village': _pick(rng, cities, n),
+            'Medical History': '',
+        }, columns=PATIENT_COLUMNS)
+
+
+def history_chunks(rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, patients=10000, first_id=1901,
+                   start_date="2025-01-01"):
+    """Prediction history for patients first_id .. first_id + patients - 1, in date order.
+
+    Inputs are built from sampled disease rows in the same format /result saves
+    (app.py), so every field parses back (history_store.INPUT_LABELS).
+    """
+    rng = np.random.default_rng(seed)
+    clock = pd.Timestamp(start_date)
+    for _, n in _chunk_sizes(rows, chunk_rows):
+        sample = sample_disease_rows(rng, n)
+        # A few minutes apart on average, always increasing
+        offsets = pd.to_timedelta(np.cumsum(rng.integers(1, 600, n)), unit='s')
+        dates = clock + offsets
+        clock = dates[-1]
+        inputs = ("Age:" + sample['Age'].astype(float).astype(str)
+                  + ", Gender:" + sample['Gender']
+                  + ", BMI:" + sample['BMI'].astype(str)
+                  + ", BP:" + sample['BloodPressure_Systolic'].astype(float).astype(str)
+                  + "/" + sample['BloodPressure_Diastolic'].astype(float).astype(str)
+                  + ", Gluc:" + sample['Glucose_Fasting_mg_dL'].astype(float).astype(str)
+                  + ", Chol:" + sample['Cholesterol_Total_mg_dL'].astype(float).astype(str)
+                  + ", Smoke:" + sample['Smoking'] + ", Alc:" + sample['AlcoholIntake']
+                  + ", Act:" + sample['PhysicalActivity'] + ", Diet:" + sample['DietQuality']
+                  + ", Sleep:" + sample['SleepHours'].astype(str)
+                  + ", Hist:" + sample['FamilyHistory'])
+        yield pd.DataFrame({
+            'Patient ID': rng.integers(first_id, first_id + patients, n),
+            'Disease': sample['TargetLabel'].to_numpy(),
+            'Risk Score': rng.uniform(35, 100, n).round(2),
+            'Date': dates.strftime("%Y-%m-%d %H:%M:%S"),
+            'Inputs': inputs.to_numpy(),
+        }, columns=HISTORY_COLUMNS)
+
+
+def _read_doctors():
+    from doctor_directory import read_doctor_csv
+    return read_doctor_csv(DOCTOR_FILE)
+
+
+def _doctor_cities():
+    """Cities doctors practise in, so synthetic patients can find doctors nearby."""
+    if os.path.exists(DOCTOR_FILE):
+        return sorted(_read_doctors()['Hospital Location'].dropna().unique().tolist())
+    return ['Alamuru', 'Hyderabad', 'Vijayawada', 'Guntur', 'Warangal']
+
+
+def doctor_chunks(rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Doctors at the real dataset's (specialization, hospital, location) combinations."""
+    rng = np.random.default_rng(seed)
+    places = _read_doctors()[['Doctor Specialization', 'Hospital', 'Hospital Location']].dropna().drop_duplicates()
+    places = places.reset_index(drop=True)
+    for start, n in _chunk_sizes(rows, chunk_rows):
+        chunk = places.take(rng.integers(0, len(places), n)).reset_index(drop=True)
+        chunk.insert(0, 'Doctor Name', 'Dr. ' + _pick(rng, FIRST_NAMES, n) + ' ' + _pick(rng, SURNAMES, n))
+        # Unique contact per row: 91 + 10 digits
+        chunk['Contact Info'] = 916000000000 + start + np.arange(n)
+        chunk['Doctor Experience (Years)'] = rng.integers(1, 36, n)
+        chunk['Rating'] = rng.integers(30, 51, n) / 10
+        chunk['Patient Count'] = rng.integers(50, 2001, n)
+        yield chunk[DOCTOR_COLUMNS]
+
+
+def write_chunks(chunks, path, fmt="csv"):
+    """Stream DataFrame chunks to one CSV or Parquet file. Returns the number of rows written."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    written = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow).")
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        written += len(chunk)
+    return written
+
+
+def generate_comprehensive_dataset(n=5000, seed=42, path="datasets/disease_dataset.csv",
+                                   chunk_rows=DEFAULT_CHUNK_ROWS, fmt="csv"):
+    written = write_chunks(disease_chunks(n, seed, chunk_rows), path, fmt)
+
+    if n > written:
+        print(f"Removed {n - written} duplicate records.")
+    print(f"Refined dataset generated with {written} unique records.")
+    if fmt == "csv" and written <= chunk_rows:
+        print(pd.read_csv(path)['TargetLabel'].value_counts())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic training, patient, history or doctor data.")
+    parser.add_argument("kind", nargs="?", choices=["disease", "patients", "history", "doctors"], default="disease")
+    parser.add_argument("--rows", type=int, default=None, help="rows to generate (default 5000 for disease, 1000000 otherwise)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="output file (default datasets/disease_dataset.csv or datasets/synthetic_<kind>.<format>)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="rows generated and written at a time (disease rows are deduplicated per chunk)")
+    parser.add_argument("--patients", type=int, default=10000, help="distinct patient IDs referenced by history rows")
+    args = parser.parse_args()
+
+    if args.kind == "disease":
+        rows = args.rows or 5000
+        path = args.out or ("datasets/disease_dataset.csv" if args.format == "csv" else "datasets/disease_dataset.parquet")
+        start = time.perf_counter()
+        generate_comprehensive_dataset(rows, args.seed, path, args.chunk_rows, args.format)
+        print(f"Wrote {path} in {time.perf_counter() - start:.1f}s")
+        return
+
+    rows = args.rows or 1000000
+    path = args.out or f"datasets/synthetic_{args.kind}.{args.format}"
+    if args.kind == "patients":
+        chunks = patient_chunks(rows, args.seed, args.chunk_rows)
+    elif args.kind == "history":
+        chunks = history_chunks(rows, args.seed, args.chunk_rows, patients=args.patients)
+    else:
+        chunks = doctor_chunks(rows, args.seed, args.chunk_rows)
+    start = time.perf_counter()
+    written = write_chunks(chunks, path, args.format)
+    print(f"Wrote {written} {args.kind} rows to {path} in {time.perf_counter() - start:.1f}s")
+
 
 if __name__ == "__main__":
-    generate_comprehensive_dataset()
+    main()
@@ -0,0 +1,480 @@
+"""Prediction history store backed by an embedded SQLite table.
+
+Appends are single-row INSERTs (no read-modify-rewrite of the whole file) and
+lookups go through an index on Patient ID, so both stay flat as history grows.
+SQLite's own locking makes the store safe to share between gunicorn workers.
+
+The 13 model inputs are stored as typed columns (one per form field, see
+preprocessing.FIELD_NAMES) next to the free-text Inputs shown to users;
+rows saved before that are parsed once by migrate_structured().
+
+Each patient also has a summary row (record count, latest prediction, the
+last TREND_POINTS risk scores) and per-disease counts, and the population
+keeps predicted-disease counts by city, age band and gender. All of them are
+updated in the same transaction as every append, so dashboards and the
+analytics endpoint never scan the history.
+
+Run ``python history_store.py`` to migrate data/history.csv in one step.
+"""
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+from preprocessing import CATEGORICAL_FIELDS, FIELD_NAMES
+
+# Column names the templates expect (the old history.csv header plus the model version)
+CSV_COLUMNS = ["Patient ID", "Disease", "Risk Score", "Date", "Inputs"]
+HISTORY_COLUMNS = CSV_COLUMNS + ["Model Version"]
+
+# Risk scores kept per patient for the rolling trend
+TREND_POINTS = 20
+
+# Labels used in the Inputs text for each feature ("BP:<bp_sys>/<bp_dia>" is handled apart)
+INPUT_LABELS = {"Age": "age", "Gender": "gender", "BMI": "bmi", "Gluc": "glucose", "Chol": "chol",
+                "Smoke": "smoking", "Alc": "alcohol", "Act": "activity", "Diet": "diet", "Sleep": "sleep",
+                "Hist": "family_history"}
+
+# History columns after the original six: the patient's city, then one per model feature
+STRUCTURED_COLUMNS = ["city"] + FIELD_NAMES
+
+# Columns of a full history export (iter_records)
+EXPORT_COLUMNS = HISTORY_COLUMNS + ["City"] + FIELD_NAMES
+
+# Lower bounds of the age bands used by the analytics
+AGE_BANDS = [0, 18, 30, 45, 60, 75]
+AGE_BAND_LABELS = ["0-17", "18-29", "30-44", "45-59", "60-74", "75+"]
+UNKNOWN = "Unknown"
+ANALYTICS_DIMENSIONS = ["city", "age_band", "gender"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id TEXT NOT NULL,
+    disease TEXT,
+    risk_score REAL,
+    date TEXT,
+    inputs TEXT,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_patient ON history (patient_id, id);
+CREATE TABLE IF NOT EXISTS patient_summary (
+    patient_id TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    latest_disease TEXT,
+    latest_risk_score REAL,
+    latest_date TEXT,
+    latest_model_version TEXT,
+    recent TEXT  -- JSON list of the last TREND_POINTS [date, disease, risk score], oldest first
+);
+CREATE TABLE IF NOT EXISTS patient_disease_counts (
+    patient_id TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, disease)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS disease_stats (
+    dimension TEXT NOT NULL,  -- one of ANALYTICS_DIMENSIONS
+    value TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    PRIMARY KEY (dimension, value, disease)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def column_type(field):
+    return "TEXT" if field == "city" or field in CATEGORICAL_FIELDS else "REAL"
+
+
+def typed_features(values):
+    """Feature values as floats (numeric fields) or strings (categorical); missing or invalid -> None."""
+    features = []
+    for field in FIELD_NAMES:
+        value = values.get(field)
+        if value is None or value == "":
+            features.append(None)
+        elif field in CATEGORICAL_FIELDS:
+            features.append(str(value))
+        else:
+            try:
+                features.append(float(value))
+            except (TypeError, ValueError):
+                features.append(None)
+    return features
+
+
+def parse_inputs(text):
+    """Feature values from an Inputs text such as "Age:50.0, BMI:30.0, BP:150.0/95.0, ..." (missing -> None)."""
+    values = {}
+    for part in (text or "").split(", "):
+        label, sep, value = part.partition(":")
+        if not sep:
+            continue
+        if label == "BP":
+            values["bp_sys"], _, values["bp_dia"] = value.partition("/")
+        elif label in INPUT_LABELS:
+            values[INPUT_LABELS[label]] = value
+    return typed_features(values)
+
+
+def age_band(age):
+    if age is None or age < 0:
+        return UNKNOWN
+    return AGE_BAND_LABELS[bisect.bisect_right(AGE_BANDS, age) - 1]
+
+
+def normalize_patient_id(patient_id):
+    """Patient IDs may come back from pandas as floats (e.g. 1800.0)."""
+    pid = str(patient_id).strip()
+    if pid.endswith('.0'):
+        pid = pid[:-2]
+    return pid
+
+
+class HistoryStore:
+    """Append-only prediction history with an index on Patient ID."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._add_missing_columns(conn)
+        self._build_summaries(conn)
+
+    def _connect(self):
+        """One connection per thread and per process (gunicorn forks after import)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _add_missing_columns(self, conn):
+        """Upgrade databases created before model versions and structured inputs were recorded."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(history)")}
+        for name in ["model_version"] + STRUCTURED_COLUMNS:
+            if name not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE history ADD COLUMN {name} {'TEXT' if name == 'model_version' else column_type(name)}")
+                except sqlite3.OperationalError:
+                    pass  # Another worker added it first
+
+    def _build_summaries(self, conn, chunk_rows=50000):
+        """Fill the summary tables once for history written before they existed."""
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'summaries_built'").fetchone() is not None:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'summaries_built'").fetchone() is None:
+                conn.execute("DELETE FROM patient_summary")
+                conn.execute("DELETE FROM patient_disease_counts")
+                cursor = conn.execute(
+                    "SELECT patient_id, disease, risk_score, date, model_version FROM history ORDER BY id")
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    self._update_summaries(conn, rows)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('summaries_built', '1')")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _update_summaries(self, conn, rows):
+        """Fold (patient_id, disease, risk_score, date, model_version) rows, oldest first, into the summaries."""
+        by_patient = {}
+        for row in rows:
+            by_patient.setdefault(row[0], []).append(row)
+
+        for pid, records in by_patient.items():
+            current = conn.execute("SELECT records, recent FROM patient_summary WHERE patient_id = ?", (pid,)).fetchone()
+            total, recent = (current[0], json.loads(current[1])) if current else (0, [])
+            recent = (recent + [[date, disease, score] for _, disease, score, date, _ in records])[-TREND_POINTS:]
+            _, disease, score, date, version = records[-1]
+            conn.execute(
+                "INSERT OR REPLACE INTO patient_summary (patient_id, records, latest_disease, latest_risk_score, "
+                "latest_date, latest_model_version, recent) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pid, total + len(records), disease, score, date, version, json.dumps(recent))
+            )
+            conn.executemany(
+                "INSERT INTO patient_disease_counts (patient_id, disease, records) VALUES (?, ?, ?) "
+                "ON CONFLICT (patient_id, disease) DO UPDATE SET records = records + excluded.records",
+                ((pid, disease, n) for disease, n in Counter(r[1] for r in records).items())
+            )
+
+    def _update_analytics(self, conn, rows):
+        """Count (disease, city, age, gender) rows into the population breakdowns."""
+        counts = Counter()
+        for disease, city, age, gender in rows:
+            counts["city", city or UNKNOWN, disease] += 1
+            counts["age_band", age_band(age), disease] += 1
+            counts["gender", gender or UNKNOWN, disease] += 1
+        conn.executemany(
+            "INSERT INTO disease_stats (dimension, value, disease, records) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (dimension, value, disease) DO UPDATE SET records = records + excluded.records",
+            ((dimension, value, disease, n) for (dimension, value, disease), n in counts.items())
+        )
+
+    def _insert_rows(self, conn, rows):
+        """Insert full history rows (see _row) and update every aggregate. Call inside a transaction."""
+        columns = ["patient_id", "disease", "risk_score", "date", "inputs", "model_version"] + STRUCTURED_COLUMNS
+        conn.executemany(
+            f"INSERT INTO history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+        self._update_summaries(conn, [row[:4] + (row[5],) for row in rows])
+        gender = 7 + FIELD_NAMES.index("gender")
+        self._update_analytics(conn, [(row[1], row[6], row[7], row[gender]) for row in rows])
+
+    @staticmethod
+    def _row(patient_id, disease, risk_score, date, inputs, model_version=None, city=None, features=None):
+        """One history row; features default to what can be parsed from the Inputs text."""
+        inputs = inputs or ""
+        feature_values = typed_features(features) if features is not None else parse_inputs(inputs)
+        return (normalize_patient_id(patient_id), str(disease), float(risk_score), date, inputs, model_version,
+                city or None, *feature_values)
+
+    def _insert(self, rows):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert_rows(conn, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append(self, patient_id, disease, risk_score, date, inputs="", model_version=None, city=None, features=None):
+        """Add one prediction record; features maps form field names (preprocessing.FIELD_NAMES) to values."""
+        self._insert([self._row(patient_id, disease, risk_score, date, inputs, model_version, city, features)])
+
+    def append_many(self, records):
+        """Add many (patient_id, disease, risk_score, date, inputs[, model_version[, city]]) records in one transaction."""
+        self._insert([self._row(*record) for record in records])
+
+    def get_patient_history(self, patient_id):
+        """All records for one patient, oldest first."""
+        rows = self._connect().execute(
+            "SELECT patient_id, disease, risk_score, date, inputs, model_version FROM history WHERE patient_id = ? ORDER BY id",
+            (normalize_patient_id(patient_id),)
+        ).fetchall()
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+    def get_patient_history_page(self, patient_id, page=1, per_page=20):
+        """(records, total) for one page of a patient's history, newest first."""
+        pid = normalize_patient_id(patient_id)
+        conn = self._connect()
+        # Walks the (patient_id, id) index backwards; the total comes from the summary row
+        rows = conn.execute(
+            "SELECT patient_id, disease, risk_score, date, inputs, model_version FROM history "
+            "WHERE patient_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (pid, per_page, (page - 1) * per_page)
+        ).fetchall()
+        total = conn.execute("SELECT records FROM patient_summary WHERE patient_id = ?", (pid,)).fetchone()
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in rows], total[0] if total else 0
+
+    def get_summary(self, patient_id):
+        """Record count, latest prediction, count per disease and recent risk scores of one patient."""
+        pid = normalize_patient_id(patient_id)
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT records, latest_disease, latest_risk_score, latest_date, latest_model_version, recent "
+            "FROM patient_summary WHERE patient_id = ?", (pid,)
+        ).fetchone()
+        if row is None:
+            return {"records": 0, "latest": None, "diseases": {}, "trend": [], "rolling_average": None, "change": None}
+        records, disease, score, date, version, recent = row
+        diseases = dict(conn.execute(
+            "SELECT disease, records FROM patient_disease_counts WHERE patient_id = ? ORDER BY records DESC, disease",
+            (pid,)
+        ).fetchall())
+        trend = [{"Date": d, "Disease": dis, "Risk Score": s} for d, dis, s in json.loads(recent)]
+        scores = [point["Risk Score"] for point in trend]
+        # Change: mean of the newer half of the recent scores minus the older half
+        half = len(scores) // 2
+        change = sum(scores[half:]) / (len(scores) - half) - sum(scores[:half]) / half if half else None
+        return {
+            "records": records,
+            "latest": {"Disease": disease, "Risk Score": score, "Date": date, "Model Version": version},
+            "diseases": diseases,
+            "trend": trend,
+            "rolling_average": sum(scores) / len(scores),
+            "change": change,
+        }
+
+    def structured_migrated(self):
+        return self._connect().execute("SELECT 1 FROM meta WHERE key = 'structured_inputs'").fetchone() is not None
+
+    def migrate_structured(self, patients, chunk_rows=50000):
+        """Once: fill the typed feature columns and city of older rows, then rebuild the analytics.
+
+        `patients` maps Patient ID -> (city, gender); the profile gender stands in
+        when the Inputs text did not record one. Returns the number of rows updated.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'structured_inputs'").fetchone() is not None:
+                conn.execute("COMMIT")
+                return 0
+
+            gender = FIELD_NAMES.index("gender")
+            assignments = ", ".join(f"{name} = ?" for name in STRUCTURED_COLUMNS)
+            updated, last_id = 0, 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT id, patient_id, inputs, {', '.join(FIELD_NAMES)} FROM history "
+                    "WHERE id > ? AND city IS NULL ORDER BY id LIMIT ?",
+                    (last_id, chunk_rows)
+                ).fetchall()
+                if not rows:
+                    break
+                changes = []
+                for row_id, pid, inputs, *features in rows:
+                    city, profile_gender = patients.get(pid, (None, None))
+                    # Rows appended since the columns exist are typed already; older ones only have the text
+                    if all(value is None for value in features):
+                        features = parse_inputs(inputs)
+                    features[gender] = features[gender] or profile_gender or None
+                    changes.append((city or None, *features, row_id))
+                conn.executemany(f"UPDATE history SET {assignments} WHERE id = ?", changes)
+                updated += len(changes)
+                last_id = rows[-1][0]
+
+            # Rebuild the breakdowns from the (now complete) columns
+            conn.execute("DELETE FROM disease_stats")
+            cursor = conn.execute("SELECT disease, city, age, gender FROM history")
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                self._update_analytics(conn, rows)
+
+            conn.execute("INSERT INTO meta (key, value) VALUES ('structured_inputs', ?)", (str(updated),))
+            conn.execute("COMMIT")
+            return updated
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def disease_distribution(self, dimensions=ANALYTICS_DIMENSIONS):
+        """{dimension: {value: {disease: records}}} for city, age band and gender, from the running counts."""
+        result = {dimension: {} for dimension in dimensions}
+        rows = self._connect().execute(
+            f"SELECT dimension, value, disease, records FROM disease_stats "
+            f"WHERE dimension IN ({', '.join('?' * len(dimensions))}) ORDER BY dimension, value, records DESC",
+            list(dimensions)
+        )
+        for dimension, value, disease, records in rows:
+            result[dimension].setdefault(value, {})[disease] = records
+        return result
+
+    def iter_records(self, chunk_rows=5000):
+        """Every record as tuples in EXPORT_COLUMNS order, oldest first, `chunk_rows` per list.
+
+        Each chunk is its own short query continuing after the last id seen,
+        so no read transaction is held open while a caller streams the rows out.
+        """
+        columns = ["patient_id", "disease", "risk_score", "date", "inputs", "model_version"] + STRUCTURED_COLUMNS
+        conn = self._connect()
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT id, {', '.join(columns)} FROM history WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_rows)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+    def patient_count(self):
+        """Number of patients with at least one record."""
+        return self._connect().execute("SELECT COUNT(*) FROM patient_summary").fetchone()[0]
+
+    def patient_ranges(self, chunk_patients=20000):
+        """(after, upto) Patient ID bounds splitting all patients into chunks of `chunk_patients`.
+
+        Only the summary table's primary key is read, so a pool of processes
+        can each load their own range with latest_inputs().
+        """
+        conn = self._connect()
+        ranges, after = [], ""
+        while True:
+            row = conn.execute(
+                "SELECT patient_id FROM patient_summary WHERE patient_id > ? ORDER BY patient_id LIMIT 1 OFFSET ?",
+                (after, chunk_patients - 1)
+            ).fetchone()
+            if row is None:
+                break
+            ranges.append((after, row[0]))
+            after = row[0]
+        last = conn.execute("SELECT MAX(patient_id) FROM patient_summary").fetchone()[0]
+        if last is not None and last > after:
+            ranges.append((after, last))
+        return ranges
+
+    def latest_inputs(self, after, upto):
+        """Each patient's latest record that has model inputs, for Patient IDs in (after, upto].
+
+        Rows are (patient_id, date, disease, risk_score, *FIELD_NAMES values),
+        one index probe per patient, in Patient ID order. Patients without
+        any such record still get a row, with everything after the ID NULL.
+        """
+        return self._connect().execute(
+            f"SELECT s.patient_id, h.date, h.disease, h.risk_score, {', '.join('h.' + f for f in FIELD_NAMES)} "
+            "FROM patient_summary s LEFT JOIN history h ON h.id = ("
+            "    SELECT id FROM history WHERE patient_id = s.patient_id AND age IS NOT NULL ORDER BY id DESC LIMIT 1"
+            ") WHERE s.patient_id > ? AND s.patient_id <= ? ORDER BY s.patient_id",
+            (after, upto)
+        ).fetchall()
+
+    def count(self):
+        """Total number of stored records."""
+        return self._connect().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def migrate_csv(self, csv_path, chunksize=50000):
+        """Import an existing history.csv once. Returns the number of rows imported."""
+        import pandas as pd
+
+        conn = self._connect()
+        # BEGIN IMMEDIATE so only one worker performs the migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone()
+            if done is not None or not os.path.exists(csv_path):
+                conn.execute("COMMIT")
+                return 0
+
+            imported = 0
+            for chunk in pd.read_csv(csv_path, dtype={"Patient ID": str}, chunksize=chunksize):
+                if 'Inputs' not in chunk.columns:
+                    chunk['Inputs'] = ""
+                chunk = chunk.fillna("")
+                self._insert_rows(conn, [self._row(pid, disease, float(score or 0), str(date), str(inputs))
+                                         for pid, disease, score, date, inputs in chunk[CSV_COLUMNS].itertuples(index=False)])
+                imported += len(chunk)
+
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (str(imported),))
+            conn.execute("COMMIT")
+            return imported
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+if __name__ == "__main__":
+    from utils import HISTORY_DB, HISTORY_FILE, get_history_store
+    store = get_history_store()
+    print(f"{HISTORY_FILE} migrated to {HISTORY_DB} with structured inputs ({store.count()} total).")
@@ -0,0 +1,67 @@
+"""Patient ID allocation from a persisted monotonic counter.
+
+The counter lives in a small SQLite table, and each allocation is one
+short write transaction, so allocation is O(1) and never hands out the same
+ID twice, even with several gunicorn workers registering at once.
+"""
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+PATIENT_COUNTER = 'patient_id'
+
+# IDs were drawn at random from 1200-1900 before the counter existed
+FIRST_PATIENT_ID = 1901
+
+
+class IdAllocator:
+    """Named monotonic counters shared by all processes using the same database file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        """One connection per thread and per process (gunicorn forks after import)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def seed(self, name, last_used):
+        """Create the counter if missing, so the first ID handed out is last_used + 1."""
+        self._connect().execute(
+            "INSERT OR IGNORE INTO counters (name, value) VALUES (?, ?)", (name, int(last_used))
+        )
+
+    def allocate(self, name, count=1):
+        """Reserve `count` consecutive values; returns the first one."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (int(count), name))
+            row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            raise KeyError(f"Counter {name!r} has not been seeded")
+        return row[0] - int(count) + 1
+
+    def current(self, name):
+        """Last value handed out (None if the counter does not exist)."""
+        row = self._connect().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
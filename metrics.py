@@ -0,0 +1,137 @@
+"""Request and stage timing, exposed in the Prometheus text format at /metrics.
+
+Every Flask route is timed by init_app(); code paths inside a request mark
+named stages with ``with stage("encode"):`` or the ``@timed("...")``
+decorator. Both feed fixed-bucket histograms (a bisect and two increments
+under a lock, a couple of microseconds), so the instrumentation can stay on
+in production. Requests slower than the slow-request threshold are logged
+with their stage breakdown.
+
+Metrics are kept per process: with several gunicorn workers each scrape
+sees the worker that answered it.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, 0.5 ms to 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("mediai_request_duration_seconds", "Flask request latency.",
+                            ["endpoint", "method", "status"])
+STAGE_SECONDS = Histogram("mediai_stage_duration_seconds", "Time spent in named processing stages.", ["stage"])
+
+# Values read at scrape time, e.g. prediction cache counters: name -> (help, type, callable)
+_gauges = {}
+
+# Stages recorded by the request running on this thread (None outside a timed request)
+_local = threading.local()
+
+
+def register_gauge(name, help_text, fn, kind="gauge"):
+    """Report fn() at every scrape (kind "counter" for values that only grow)."""
+    _gauges[name] = (help_text, kind, fn)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as stage `name`, and add it to the current request's breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        stages = getattr(_local, 'stages', None)
+        if stages is not None:
+            stages.append((name, elapsed))
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    parts = [REQUEST_SECONDS.render(), STAGE_SECONDS.render()]
+    for name, (help_text, kind, fn) in sorted(_gauges.items()):
+        parts.append(f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n{name} {fn()}")
+    return "\n".join(parts) + "\n"
+
+
+def init_app(app, slow_request_ms=None):
+    """Time every request; log the stage breakdown of requests slower than slow_request_ms."""
+    from flask import request
+
+    @app.before_request
+    def _start_timer():
+        _local.start = time.perf_counter()
+        _local.stages = []
+
+    @app.after_request
+    def _record(response):
+        start = getattr(_local, 'start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        # Route pattern, not the raw path, so IDs in URLs do not create new series
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(elapsed, endpoint, request.method, str(response.status_code))
+        if slow_request_ms is not None and elapsed * 1000 >= slow_request_ms:
+            breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in _local.stages)
+            print(f"SLOW REQUEST {request.method} {request.path} {response.status_code} "
+                  f"{elapsed * 1000:.1f}ms [{breakdown}]")
+        _local.start = None
+        _local.stages = None
+        return response
@@ -0,0 +1,104 @@
+"""Micro-batching of concurrent single-row predictions.
+
+Scoring one row costs almost as much as scoring a few dozen: sklearn's
+predict_proba pays its validation and per-tree dispatch overhead per call.
+When several request threads score at the same time, the scheduler thread
+collects their rows for up to `max_wait_ms` (or until `max_batch` rows are
+waiting), scores them as one matrix per model version and hands each caller
+its own row back.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class _Pending:
+    """One caller's row waiting for a result."""
+
+    __slots__ = ('bundle', 'features', 'done', 'label', 'probabilities', 'error')
+
+    def __init__(self, bundle, features):
+        self.bundle = bundle
+        self.features = features
+        self.done = threading.Event()
+        self.label = None
+        self.probabilities = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collects single-row scoring calls from many threads into batches."""
+
+    def __init__(self, max_wait_ms=2.0, max_batch=64):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_started(self):
+        """Start the scheduler thread in this process (threads do not survive gunicorn's fork)."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def score(self, bundle, features):
+        """Score a (1, 13) row together with whatever else arrives. Returns (labels, probabilities)."""
+        self._ensure_started()
+        pending = _Pending(bundle, features)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return np.array([pending.label]), pending.probabilities[np.newaxis]
+
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Rows scored by different model versions (during a hot swap) are batched separately
+            groups = {}
+            for pending in batch:
+                groups.setdefault(id(pending.bundle), []).append(pending)
+            for group in groups.values():
+                self._score_group(group)
+
+    def _score_group(self, group):
+        try:
+            features = np.vstack([pending.features for pending in group])
+            labels, probabilities = group[0].bundle.score(features)
+            for i, pending in enumerate(group):
+                pending.label = labels[i]
+                pending.probabilities = probabilities[i]
+            self.batches += 1
+            self.rows += len(group)
+        except Exception as e:
+            for pending in group:
+                pending.error = e
+        finally:
+            for pending in group:
+                pending.done.set()
@@ -0,0 +1,283 @@
+"""Versioned model directory with atomic publish and zero-downtime hot reload.
+
+Layout::
+
+    models/
+        versions/<version>/     one complete artifact set (scaler, encoders, model, compiled export)
+        LATEST                  version written by the last publish
+        PINNED                  optional admin override (pin / rollback)
+
+A version directory is fully written under a temporary name and then
+renamed into place, and pointer files are replaced atomically, so a reader
+never sees half a version. Running workers notice a pointer change,
+load the new version in a background thread and swap it in with a single
+reference assignment; requests already in flight keep the bundle they
+started with. The legacy files in models/ act as version "legacy" until
+the first version is published.
+
+A version written by ``train_models.py --compact`` has no sklearn pickle,
+only the compiled export, and is always served by the compiled engine.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from fast_forest import compile_forest, load_compiled
+from metrics import stage
+from preprocessing import build_encoder_tables
+
+LEGACY_VERSION = "legacy"
+
+MODEL_FILE = "unified_model.pkl"
+SCALER_FILE = "unified_scaler.pkl"
+ENCODERS_FILE = "unified_encoders.pkl"
+COMPILED_DIR = "unified_compiled"
+MANIFEST_FILE = "manifest.json"
+
+# How often each worker stats the pointer files
+RELOAD_CHECK_SECONDS = 2.0
+
+
+class ModelBundle:
+    """Scaler, encoders and model of one version, always used together."""
+
+    def __init__(self, version, tables, engine=None, model=None, scaler=None, encoders=None):
+        self.version = version
+        self.tables = tables
+        self.engine = engine
+        self.model = model
+        self.scaler = scaler
+        self.encoders = encoders
+        self._explainer = None
+        self._explainer_lock = threading.Lock()
+
+    @property
+    def classes_(self):
+        """Class labels in probability-column order."""
+        return self.engine.classes_ if self.engine is not None else self.model.classes_
+
+    def score(self, features):
+        """Scale and score a feature matrix in one pass. Returns (labels, probabilities)."""
+        if self.engine is not None:
+            # Scaling is folded into the compiled thresholds
+            with stage("forest"):
+                return self.engine.score(features)
+        with stage("scale"):
+            features_scaled = self.scaler.transform(features)
+        with stage("forest"):
+            probabilities = self.model.predict_proba(features_scaled)
+            # Same as model.predict, without running the forest a second time
+            labels = self.model.classes_.take(np.argmax(probabilities, axis=1))
+        return labels, probabilities
+
+    def explainer(self):
+        """ForestExplainer for this version, built on first use (compiling the forest if needed)."""
+        if self._explainer is None:
+            with self._explainer_lock:
+                if self._explainer is None:
+                    from explain import ForestExplainer
+                    forest = self.engine if self.engine is not None else compile_forest(self.model, self.scaler)
+                    self._explainer = ForestExplainer(forest)
+        return self._explainer
+
+    def explain(self, features):
+        """(bias, contributions) of a feature matrix, see explain.py."""
+        with stage("explain"):
+            return self.explainer().explain(features)
+
+
+def load_bundle(directory, version, engine='sklearn'):
+    """Load one artifact set from `directory`; None if it is incomplete."""
+    compiled_dir = os.path.join(directory, COMPILED_DIR)
+    # Compact versions (train_models.py --compact) ship only the compiled export, whatever the engine
+    compiled_only = not os.path.exists(os.path.join(directory, MODEL_FILE))
+    if (engine == 'compiled' or compiled_only) and os.path.isdir(compiled_dir):
+        # Arrays are memory-mapped: no unpickling or sklearn import, and the
+        # pages are shared by every worker that maps the same files
+        compiled, tables = load_compiled(compiled_dir)
+        return ModelBundle(version, tables, engine=compiled)
+
+    paths = [os.path.join(directory, name) for name in (MODEL_FILE, SCALER_FILE, ENCODERS_FILE)]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    import joblib  # Unpickling pulls in sklearn, only needed on this path
+    model, scaler, encoders = (joblib.load(path) for path in paths)
+    compiled = compile_forest(model, scaler) if engine == 'compiled' else None
+    return ModelBundle(version, build_encoder_tables(encoders), engine=compiled,
+                       model=model, scaler=scaler, encoders=encoders)
+
+
+def _write_pointer(path, value):
+    """Replace a small text file atomically."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+
+
+def _read_pointer(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class ModelRegistry:
+    """Published model versions plus the bundle this process is serving."""
+
+    def __init__(self, models_dir="models", engine='sklearn'):
+        self.models_dir = models_dir
+        self.versions_dir = os.path.join(models_dir, "versions")
+        self.latest_file = os.path.join(models_dir, "LATEST")
+        self.pinned_file = os.path.join(models_dir, "PINNED")
+        self.engine = engine
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._loading = None
+        self._failed = None  # (version, signature) of the last version that would not load
+        self._next_check = 0.0
+        self._listeners = []
+
+    # --- Publishing side (train_models.py, admin) ---
+
+    def versions(self):
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir)
+                      if not v.startswith('.') and os.path.isdir(os.path.join(self.versions_dir, v)))
+
+    def version_dir(self, version):
+        return self.models_dir if version == LEGACY_VERSION else os.path.join(self.versions_dir, version)
+
+    def manifest(self, version):
+        try:
+            with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def staging_dir(self):
+        """Fresh directory to write a new version's artifacts into before publish()."""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".staging-", dir=self.versions_dir)
+
+    def publish(self, staging_dir, metadata=None):
+        """Move a fully written staging directory into place and make it the latest version."""
+        version = datetime.now().strftime("v%Y%m%d-%H%M%S")
+        while os.path.exists(os.path.join(self.versions_dir, version)):
+            version += "a"
+        manifest = dict(metadata or {}, version=version, published=datetime.now().isoformat(timespec='seconds'))
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging_dir, os.path.join(self.versions_dir, version))
+        _write_pointer(self.latest_file, version)
+        return version
+
+    def latest(self):
+        return _read_pointer(self.latest_file) or (self.versions() or [LEGACY_VERSION])[-1]
+
+    def pinned(self):
+        return _read_pointer(self.pinned_file)
+
+    def active_version(self):
+        """Version workers should serve: the pinned one if set, else the latest."""
+        return self.pinned() or self.latest()
+
+    def pin(self, version):
+        if version != LEGACY_VERSION and version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        _write_pointer(self.pinned_file, version)
+
+    def unpin(self):
+        try:
+            os.remove(self.pinned_file)
+        except FileNotFoundError:
+            pass
+
+    def rollback(self):
+        """Pin the version published before the one currently active."""
+        versions = [LEGACY_VERSION] + self.versions()
+        active = self.active_version()
+        if active not in versions or versions.index(active) == 0:
+            raise ValueError(f"No version to roll back to from {active}")
+        previous = versions[versions.index(active) - 1]
+        self.pin(previous)
+        return previous
+
+    def discard_staging(self, staging_dir):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # --- Serving side (app.py) ---
+
+    def on_swap(self, callback):
+        """Call `callback(bundle)` whenever a new bundle is swapped in."""
+        self._listeners.append(callback)
+
+    def _swap(self, bundle):
+        self._bundle = bundle
+        for callback in self._listeners:
+            callback(bundle)
+
+    def load(self):
+        """Load the active version synchronously (startup)."""
+        version = self.active_version()
+        bundle = load_bundle(self.version_dir(version), version, self.engine)
+        if bundle is not None:
+            self._swap(bundle)
+        self._next_check = time.monotonic() + RELOAD_CHECK_SECONDS
+        return bundle
+
+    def current(self):
+        """The bundle to use for this request (None if no model is available)."""
+        return self._bundle
+
+    def maybe_reload(self):
+        """Cheap per-request check; loads a changed active version in the background."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + RELOAD_CHECK_SECONDS
+
+        version = self.active_version()
+        if self._bundle is not None and self._bundle.version == version:
+            return
+        # A version that failed is only retried once its files change
+        if self._failed is not None and self._failed == (version, self._signature(version)):
+            return
+        with self._lock:
+            if self._loading is not None and self._loading.is_alive():
+                return
+            self._loading = threading.Thread(target=self._load_in_background, args=(version,), daemon=True)
+            self._loading.start()
+
+    def _signature(self, version):
+        """Names, sizes and mtimes of a version directory's files (None if it is missing)."""
+        try:
+            return tuple(sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                                for entry in os.scandir(self.version_dir(version))))
+        except FileNotFoundError:
+            return None
+
+    def _load_in_background(self, version):
+        signature = self._signature(version)
+        try:
+            bundle = load_bundle(self.version_dir(version), version, self.engine)
+        except Exception as e:
+            print(f"Model version {version} failed to load: {e}")
+            self._failed = (version, signature)
+            return
+        if bundle is None:
+            print(f"Model version {version} is incomplete; keeping {getattr(self._bundle, 'version', None)}.")
+            self._failed = (version, signature)
+            return
+        self._failed = None
+        self._swap(bundle)
+        print(f"Model version {version} loaded.")
@@ -0,0 +1,243 @@
+"""In-memory view of the patients table with hash indexes, counters and paging.
+
+The parsed table is kept in memory and only re-read when the storage
+signature (file mtime/size) changes. When patients were only appended, just
+the new rows are read from the storage backend (see patient_storage.py) and
+the indexes and summary counters are extended in place, so neither lookups
+nor the admin dashboard scan or re-parse the whole table per request.
+"""
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Dashboard columns that can be sorted on, and whether they sort numerically
+SORTABLE_COLUMNS = {
+    'Patient ID': True,
+    'Name': False,
+    'Age': True,
+    'Gender': False,
+    'City/Village': False,
+}
+
+
+def normalize_id(value):
+    """Normalize IDs/contacts that pandas may have read as floats (e.g. 1800.0)."""
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def _sort_keys(column, sort):
+    """Sort keys of a dashboard column as an array (NaN where a value has no key)."""
+    if SORTABLE_COLUMNS[sort]:
+        return pd.to_numeric(column, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return column.astype(object).str.lower().to_numpy(dtype=object, na_value=np.nan)
+
+
+def _insert_rows(keys, order, new_keys, start):
+    """Merge rows start, start + 1, ... with `new_keys` into a stable sort order.
+
+    `keys` are the sorted non-missing keys and `order` the row positions
+    (rows without a key last), as cached by PatientRegistry._order. Equal
+    keys keep row order because new rows have the highest positions.
+    """
+    positions = np.arange(start, start + len(new_keys))
+    missing = pd.isna(new_keys)
+    new_keys, valid_positions = new_keys[~missing], positions[~missing]
+    by_key = np.argsort(new_keys, kind='stable')
+    new_keys, valid_positions = new_keys[by_key], valid_positions[by_key]
+    at = np.searchsorted(keys, new_keys, side='right')
+    n_valid = len(keys)
+    order = np.concatenate([np.insert(order[:n_valid], at, valid_positions), order[n_valid:], positions[missing]])
+    return np.insert(keys, at, new_keys), order
+
+
+class PatientStats:
+    """Summary counters for the admin dashboard, updated one patient at a time."""
+
+    def __init__(self):
+        self.total = 0
+        self.gender = Counter()
+        self.city = Counter()
+
+    def add(self, record):
+        self.total += 1
+        self.gender[record.get('Gender', '')] += 1
+        city = str(record.get('City/Village', '')).strip()
+        if city:
+            self.city[city] += 1
+
+    def top_cities(self, n=5):
+        return self.city.most_common(n)
+
+
+class PatientRegistry:
+    """Cached patients table with indexes on Patient ID and (lowercased name, contact)."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._signature = None
+        self._cursor = None  # storage position read up to
+        self._columns = []
+        self._records = []
+        self._by_id = {}
+        self._by_name_contact = {}
+        self.stats = PatientStats()
+        self._frame = None  # DataFrame of the first len(frame) records, built lazily for paging
+        self._orders = {}  # sort column -> (sorted keys, row order) of a prefix of self._frame
+
+    def _refresh(self):
+        """Bring the in-memory table up to date with the storage."""
+        signature = self.storage.signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            if signature is None:
+                self._reset()
+                return
+            appended = None
+            if self._columns and self._cursor is not None:
+                appended = self.storage.read_appended(self._columns, self._cursor)
+            if appended is not None:
+                records, self._cursor = appended
+                self._add_records(records)
+            else:
+                columns, records, cursor = self.storage.read_all()
+                self._reset()
+                self._columns = columns
+                self._add_records(records)
+                self._cursor = cursor
+            self._signature = signature
+
+    def _add_records(self, records):
+        for record in records:
+            i = len(self._records)
+            record['Patient ID'] = normalize_id(record.get('Patient ID', ''))
+            self._records.append(record)
+            # Keep the first row for duplicate keys, like the old iloc[0] lookups
+            self._by_id.setdefault(record['Patient ID'], i)
+            key = (str(record.get('Name', '')).lower(), normalize_id(record.get('Contact', '')))
+            self._by_name_contact.setdefault(key, i)
+            self.stats.add(record)
+
+    def invalidate(self, full=False):
+        """Re-check the file on the next access; full=True forces a complete re-parse."""
+        with self._lock:
+            if full:
+                self._columns = []
+            self._signature = None
+
+    def columns(self):
+        """Header of the patients table."""
+        self._refresh()
+        return list(self._columns)
+
+    def _dataframe(self):
+        """DataFrame of all patients; appended patients are added to the cached frame."""
+        self._refresh()
+        with self._lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame(self._records, columns=self._columns or None)
+                self._orders = {}
+            elif len(self._frame) < len(self._records):
+                start = len(self._frame)
+                added = pd.DataFrame(self._records[start:], columns=self._frame.columns)
+                self._frame = pd.concat([self._frame, added], ignore_index=True)
+            return self._frame
+
+    def dataframe(self):
+        """All patients as a DataFrame (a copy, safe for callers to modify)."""
+        return self._dataframe().copy()
+
+    def get(self, patient_id):
+        """Patient dict by ID, or None."""
+        self._refresh()
+        i = self._by_id.get(normalize_id(patient_id))
+        return dict(self._records[i]) if i is not None else None
+
+    def login(self, identifier, contact):
+        """Patient dict whose ID or name (case-insensitive) and contact match, or None."""
+        self._refresh()
+        identifier = str(identifier).strip()
+        contact = normalize_id(contact)
+
+        candidates = []
+        i = self._by_id.get(normalize_id(identifier))
+        if i is not None and normalize_id(self._records[i].get('Contact', '')) == contact:
+            candidates.append(i)
+        i = self._by_name_contact.get((identifier.lower(), contact))
+        if i is not None:
+            candidates.append(i)
+        if not candidates:
+            return None
+
+        # First matching row in file order, as before
+        patient = dict(self._records[min(candidates)])
+        patient['Name'] = str(patient.get('Name', ''))
+        patient['Contact'] = normalize_id(patient.get('Contact', ''))
+        return patient
+
+    def summary(self):
+        """Current dashboard counters (no scan of the table)."""
+        self._refresh()
+        return self.stats
+
+    def _order(self, df, sort):
+        """Row order for a sort column, cached; rows appended since are merged into it."""
+        with self._lock:
+            cached = self._orders.get(sort) if df is self._frame else None
+        if cached is not None and len(cached[1]) == len(df):
+            return cached[1]
+        if cached is not None and len(cached[1]) < len(df):
+            start = len(cached[1])
+            keys, order = _insert_rows(*cached, _sort_keys(df[sort].iloc[start:], sort), start)
+        else:
+            keys = _sort_keys(df[sort], sort)
+            order = pd.Series(keys).sort_values(kind='stable', na_position='last').index.to_numpy()
+            keys = keys[order[:np.count_nonzero(~pd.isna(keys))]]
+        with self._lock:
+            if df is self._frame:
+                self._orders[sort] = (keys, order)
+        return order
+
+    def page(self, search="", gender="", city="", sort="Patient ID", descending=False, page=1, per_page=25):
+        """One page of patients after filtering and sorting. Returns (records, matching count)."""
+        df = self._dataframe()
+        if df.empty:
+            return [], 0
+
+        if sort not in SORTABLE_COLUMNS or sort not in df.columns:
+            sort = 'Patient ID'
+        order = self._order(df, sort)
+        if descending:
+            order = order[::-1]
+
+        # Filter with masks on the unsorted frame and only reorder positions,
+        # so just the rows on the requested page are ever copied
+        mask = None
+        search = str(search or "").strip().lower()
+        if search:
+            mask = df['Name'].str.lower().str.contains(search, regex=False) | df['Patient ID'].str.startswith(search)
+        if gender:
+            mask = (df['Gender'] == gender) if mask is None else mask & (df['Gender'] == gender)
+        if city:
+            mask = (df['City/Village'] == city) if mask is None else mask & (df['City/Village'] == city)
+        if mask is not None:
+            order = order[mask.to_numpy()[order]]
+
+        total = len(order)
+        start = (max(page, 1) - 1) * per_page
+        return df.take(order[start:start + per_page]).to_dict('records'), total
+
+    def __len__(self):
+        self._refresh()
+        return len(self._records)
@@ -0,0 +1,325 @@
+"""Storage backends for the patients table.
+
+Both backends keep every cell as text (like the CSV always did) and offer
+the same operations: a full read, an incremental read of what was appended
+since a cursor, column/filter reads, a chunked read for exports, appends of
+one or many records and an atomic full rewrite. Writers hold
+file_lock(storage.path).
+
+- CsvPatientStorage (default): data/patients.csv, appends are one O_APPEND
+  write and incremental reads parse only the new bytes.
+- ParquetPatientStorage: a directory of Parquet part files. Reads are
+  binary and columnar (no text parsing or type inference), can load just
+  the columns needed and push filters down to the row groups. Each append
+  adds a small part file; parts are compacted into one when they pile up.
+  Needs pyarrow (optional dependency).
+
+Filters are lists of (column, op, value) with op one of "==", "!=", "in".
+"""
+import csv
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn there, so a single process is the only writer
+    fcntl = None
+
+# Bytes kept from the end of the parsed CSV region to detect in-place rewrites
+_TAIL_CHECK_BYTES = 64
+
+_thread_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on <path>.lock, held across threads and gunicorn worker processes."""
+    with _thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_csv_row(path, columns, row):
+    """Append one row to a CSV file without rewriting it. Call with file_lock(path) held."""
+    append_csv_rows(path, columns, [row])
+
+
+def append_csv_rows(path, columns, rows):
+    """Append rows (dicts) to a CSV file in one write. Call with file_lock(path) held."""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerows([row.get(col, "") for col in columns] for row in rows)
+    data = buf.getvalue().encode('utf-8')
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                data = b'\n' + data
+
+    # One O_APPEND write, so readers never see rows from two writers interleaved
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def replace_csv(path, df):
+    """Rewrite a CSV atomically: write a temp file next to it, then rename over it."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def to_records(df):
+    """Rows as dicts of text cells; several times faster than DataFrame.to_dict('records')."""
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[col].astype(object).tolist() for col in columns))]
+
+
+def apply_filters(df, filters):
+    """Apply (column, op, value) filters to a DataFrame of text cells."""
+    for column, op, value in filters or []:
+        if op == "==":
+            df = df[df[column] == str(value)]
+        elif op == "!=":
+            df = df[df[column] != str(value)]
+        elif op == "in":
+            df = df[df[column].isin([str(v) for v in value])]
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return df
+
+
+class CsvPatientStorage:
+    """patients.csv, appended in place."""
+
+    kind = "csv"
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        if not os.path.exists(path) and columns:
+            pd.DataFrame(columns=columns).to_csv(path, index=False)
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def read_all(self):
+        """(columns, records, cursor) for the whole file."""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        columns, records = [], []
+        if data.strip():
+            # Everything as text, empty cells as "" (no NaN to trip up display)
+            df = pd.read_csv(io.BytesIO(data), dtype=object, keep_default_na=False)
+            columns, records = list(df.columns), to_records(df)
+        return columns, records, (len(data), data[-_TAIL_CHECK_BYTES:])
+
+    def read_appended(self, columns, cursor):
+        """(records, cursor) appended since `cursor`, or None if the file was rewritten."""
+        offset, tail = cursor
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < offset:
+                return None
+            # The bytes we already parsed must still be at the start of the file
+            f.seek(offset - len(tail))
+            if f.read(len(tail)) != tail:
+                return None
+            data = f.read()
+        # Only parse complete lines; a half-written row is picked up next time
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return [], cursor
+        chunk = data[:end]
+        # A few new rows at a time: the csv module is much cheaper than a pandas parse here
+        records = []
+        for row in csv.reader(io.StringIO(chunk.decode('utf-8'))):
+            if not row:
+                continue
+            row = row + [""] * (len(columns) - len(row))
+            records.append(dict(zip(columns, row)))
+        return records, (offset + end, (tail + chunk)[-_TAIL_CHECK_BYTES:])
+
+    def read(self, columns=None, filters=None):
+        """DataFrame of text cells, only `columns` parsed, rows matching `filters`."""
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+        df = pd.read_csv(self.path, dtype=str, keep_default_na=False, usecols=usecols)
+        df = apply_filters(df, filters)
+        return df[list(columns)] if columns is not None else df
+
+    def iter_chunks(self, chunk_rows):
+        """DataFrames of text cells, `chunk_rows` rows at a time, in file order."""
+        yield from pd.read_csv(self.path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+    def append(self, columns, record):
+        append_csv_row(self.path, columns, record)
+
+    def append_many(self, columns, records):
+        append_csv_rows(self.path, columns, records)
+
+    def rewrite(self, df):
+        replace_csv(self.path, df)
+
+
+class ParquetPatientStorage:
+    """Directory of Parquet parts named <generation>-<sequence>.parquet.
+
+    A rewrite writes generation g+1 as one part and then removes the older
+    parts; readers only ever look at the newest generation.
+    """
+
+    kind = "parquet"
+
+    # Merge appended parts into one file once there are this many
+    COMPACT_PARTS = 64
+
+    def __init__(self, path, columns=None):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet patient storage needs pyarrow (pip install pyarrow).")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._default_columns = list(columns or [])
+
+    def _parts(self):
+        """(generation, sequence, file name) of the newest generation's parts, in append order."""
+        parts = []
+        for name in os.listdir(self.path):
+            if name.endswith(".parquet") and not name.startswith("."):
+                generation, sequence = name[:-len(".parquet")].split("-")
+                parts.append((int(generation), int(sequence), name))
+        if not parts:
+            return []
+        newest = max(p[0] for p in parts)
+        return sorted(p for p in parts if p[0] == newest)
+
+    def signature(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_parts(self, parts, columns=None, filters=None):
+        frames = []
+        for _, _, name in parts:
+            frames.append(pd.read_parquet(os.path.join(self.path, name), engine="pyarrow",
+                                          columns=columns, filters=filters or None))
+        if not frames:
+            return pd.DataFrame(columns=columns or self._default_columns)
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return df.astype(str)
+
+    def read_all(self):
+        for _ in range(3):
+            parts = self._parts()
+            try:
+                df = self._read_parts(parts)
+            except FileNotFoundError:
+                continue  # A rewrite removed a part under us; list again
+            cursor = (parts[-1][0], parts[-1][1]) if parts else (0, -1)
+            return list(df.columns), to_records(df), cursor
+        raise RuntimeError(f"{self.path} keeps changing while being read")
+
+    def read_appended(self, columns, cursor):
+        generation, sequence = cursor
+        parts = self._parts()
+        if parts and parts[0][0] != generation:
+            return None
+        new = [p for p in parts if p[1] > sequence]
+        if not new:
+            return [], cursor
+        try:
+            df = self._read_parts(new)
+        except FileNotFoundError:
+            return None
+        return to_records(df.reindex(columns=columns, fill_value="")), (new[-1][0], new[-1][1])
+
+    def read(self, columns=None, filters=None):
+        # Column projection and filters are pushed down into the Parquet reader
+        return self._read_parts(self._parts(), columns, filters)
+
+    def iter_chunks(self, chunk_rows):
+        import pyarrow.parquet as pq
+        for _, _, name in self._parts():
+            for batch in pq.ParquetFile(os.path.join(self.path, name)).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas().astype(str)
+
+    def _write_part(self, df, generation, sequence):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df.astype(str), preserve_index=False)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, os.path.join(self.path, f"{generation:06d}-{sequence:09d}.parquet"))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def append(self, columns, record):
+        """Add one record as a new part. Call with file_lock(path) held."""
+        self.append_many(columns, [record])
+
+    def append_many(self, columns, records):
+        """Add records as one new part. Call with file_lock(path) held."""
+        parts = self._parts()
+        generation, sequence = (parts[-1][0], parts[-1][1] + 1) if parts else (0, 0)
+        self._write_part(pd.DataFrame([{col: record.get(col, "") for col in columns} for record in records],
+                                      columns=columns), generation, sequence)
+        if len(parts) + 1 >= self.COMPACT_PARTS:
+            self.rewrite(self._read_parts(self._parts()))
+
+    def rewrite(self, df):
+        """Replace the whole table with `df` as one new generation."""
+        old = self._parts()
+        generation = old[0][0] + 1 if old else 0
+        self._write_part(df, generation, 0)
+        for _, _, name in old:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+
+def open_patient_storage(kind, csv_path, parquet_path, columns):
+    """Storage backend by name ("csv" or "parquet"); a new Parquet store starts from the CSV."""
+    if kind == "csv":
+        return CsvPatientStorage(csv_path, columns)
+    if kind != "parquet":
+        raise ValueError(f"Unknown patient storage backend: {kind}")
+    storage = ParquetPatientStorage(parquet_path, columns)
+    with file_lock(storage.path):
+        if not storage._parts():
+            if os.path.exists(csv_path):
+                df = CsvPatientStorage(csv_path).read()
+            else:
+                df = pd.DataFrame(columns=columns)
+            storage.rewrite(df)
+    return storage
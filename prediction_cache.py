@@ -0,0 +1,112 @@
+"""Bounded LRU + TTL cache of single-row predictions.
+
+Keys are the model version plus the encoded 13-feature vector, so a rerun
+of /result with the same vitals skips scaling and the forest entirely.
+With rounding enabled, numeric vitals are first rounded to the precision
+they are measured at (e.g. blood pressure to 1 mmHg) and the rounded row is
+what gets scored, so every submission in the same bucket gets the same
+answer. The cache is cleared whenever a new model version is swapped in.
+get() caches any other per-row result the same way (e.g. explanations).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from preprocessing import FIELD_NAMES
+
+# Decimal places kept per numeric field when rounding is enabled
+CLINICAL_PRECISION = {
+    'age': 0,
+    'bmi': 1,
+    'bp_sys': 0,
+    'bp_dia': 0,
+    'glucose': 0,
+    'chol': 0,
+    'sleep': 1,
+}
+
+_ROUND_COLUMNS = [FIELD_NAMES.index(name) for name in CLINICAL_PRECISION]
+_ROUND_DECIMALS = list(CLINICAL_PRECISION.values())
+
+
+def round_features(features):
+    """Copy of a feature matrix with numeric vitals rounded to CLINICAL_PRECISION."""
+    rounded = np.array(features, dtype=np.float64)
+    for column, decimals in zip(_ROUND_COLUMNS, _ROUND_DECIMALS):
+        rounded[:, column] = np.round(rounded[:, column], decimals)
+    return rounded
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, max_entries=10000, ttl=3600, rounding=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.rounding = rounding
+        self._entries = OrderedDict()  # key -> (expires at, cached value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def score(self, version, features, score_fn):
+        """(label, probabilities) for a (1, 13) feature row, calling score_fn(features) on a miss."""
+        def first_row(rows):
+            labels, probabilities = score_fn(rows)
+            row = probabilities[0].copy()
+            row.setflags(write=False)
+            return labels[0], row
+        return self.get(version, features, first_row)
+
+    def get(self, version, features, compute):
+        """compute(features) for a (1, 13) feature row, cached under the model version and the row."""
+        if self.rounding:
+            features = round_features(features)
+        key = (version, features.tobytes())
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Compute outside the lock; two concurrent misses on one key just both compute
+        value = compute(features)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self, *_):
+        """Drop every entry (model version changed); counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "rounding": self.rounding,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,101 @@
+"""Feature preprocessing shared by the web app and offline scoring."""
+import numpy as np
+import pandas as pd
+
+# Model features. Order MUST match training (see train_models.py):
+# Age, Gender, BMI, BP_Sys, BP_Dia, Glucose, Cholesterol, Smoking, Alcohol, Activity, Diet, Sleep, History
+FEATURE_COLUMNS = [
+    'Age', 'Gender', 'BMI', 'BloodPressure_Systolic', 'BloodPressure_Diastolic',
+    'Glucose_Fasting_mg_dL', 'Cholesterol_Total_mg_dL', 'Smoking',
+    'AlcoholIntake', 'PhysicalActivity', 'DietQuality', 'SleepHours',
+    'FamilyHistory'
+]
+
+# Form / JSON field name for each model feature (same order as FEATURE_COLUMNS)
+FIELD_NAMES = [
+    'age', 'gender', 'bmi', 'bp_sys', 'bp_dia', 'glucose', 'chol',
+    'smoking', 'alcohol', 'activity', 'diet', 'sleep', 'family_history'
+]
+
+# Categorical form fields and the encoder that handles them
+CATEGORICAL_FIELDS = {
+    'gender': 'Gender',
+    'smoking': 'Smoking',
+    'alcohol': 'AlcoholIntake',
+    'activity': 'PhysicalActivity',
+    'diet': 'DietQuality',
+    'family_history': 'FamilyHistory',
+}
+
+# Code used for categories the encoder has never seen
+UNKNOWN_CODE = 0
+
+# Form value that training read as NaN (pandas' default NA strings include "None"),
+# e.g. no alcohol or no family history; LabelEncoder gave NaN its own class
+MISSING_CATEGORY = 'None'
+
+
+def build_encoder_tables(encoders):
+    """Turn fitted LabelEncoders into plain {category: code} lookup tables."""
+    tables = {}
+    for name, le in encoders.items():
+        table = {}
+        for code, cls in enumerate(le.classes_):
+            if isinstance(cls, str):
+                table[cls] = code
+            elif cls != cls:
+                # The NaN class is what the form sends as 'None'
+                table[MISSING_CATEGORY] = code
+        tables[name] = table
+    return tables
+
+
+def encode_value(tables, name, val):
+    """Encode one categorical value, falling back to UNKNOWN_CODE."""
+    table = tables.get(name)
+    if table is None:
+        return UNKNOWN_CODE
+    return table.get(val, UNKNOWN_CODE)
+
+
+def encode_column(tables, name, values):
+    """Encode a whole column of categorical values with one hash-join."""
+    table = tables.get(name)
+    if table is None:
+        return np.full(len(values), UNKNOWN_CODE, dtype=float)
+    codes = pd.Series(values, dtype=object).map(table)
+    return codes.fillna(UNKNOWN_CODE).to_numpy(dtype=float)
+
+
+def row_to_features(tables, row):
+    """Build the (1, 13) feature array for a single form/JSON row."""
+    features = []
+    for field in FIELD_NAMES:
+        if field in CATEGORICAL_FIELDS:
+            features.append(encode_value(tables, CATEGORICAL_FIELDS[field], row[field]))
+        else:
+            features.append(float(row[field]))
+    return np.array([features], dtype=float)
+
+
+def rows_to_features(tables, rows):
+    """Build the (n, 13) feature matrix for many rows (list of dicts or DataFrame)."""
+    if isinstance(rows, pd.DataFrame):
+        frame = rows
+    else:
+        frame = pd.DataFrame.from_records(rows)
+
+    missing = [field for field in FIELD_NAMES if field not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    X = np.empty((len(frame), len(FIELD_NAMES)), dtype=float)
+    for i, field in enumerate(FIELD_NAMES):
+        if field in CATEGORICAL_FIELDS:
+            X[:, i] = encode_column(tables, CATEGORICAL_FIELDS[field], frame[field].to_numpy(dtype=object))
+        else:
+            column = pd.to_numeric(frame[field], errors='raise').to_numpy(dtype=float)
+            if np.isnan(column).any():
+                raise ValueError(f"Missing value for {field}")
+            X[:, i] = column
+    return X
@@ -0,0 +1,58 @@
+"""The drift monitor must stay quiet on training data and flag a clear shift."""
+import os
+
+import joblib
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from drift_monitor import DriftMonitor, load_training_stats
+from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, build_encoder_tables
+
+
+@pytest.fixture(scope="module")
+def training():
+    """(encoder tables, training stats, dataset rows as form values)."""
+    models = os.path.join(ROOT, "models")
+    tables = build_encoder_tables(joblib.load(os.path.join(models, "unified_encoders.pkl")))
+    # Read like the form sends it: "None" stays a string
+    df = pd.read_csv(os.path.join(ROOT, "datasets", "disease_dataset.csv"), keep_default_na=False)
+    rows = df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES))).to_dict("records")
+    return tables, load_training_stats(models, tables), rows
+
+
+def observe_all(path, tables, rows):
+    monitor = DriftMonitor(str(path), merge_seconds=3600)
+    for row in rows:
+        monitor.observe(row, tables)
+    return monitor
+
+
+def test_training_data_has_no_drift(training, tmp_path):
+    tables, stats, rows = training
+    report = observe_all(tmp_path / "state.db", tables, rows).report(stats)
+    assert report["observations"] == len(rows)
+    assert report["drifting"] == []
+    assert report["features"]["alcohol"]["unknown_rate"] == 0
+    assert report["features"]["family_history"]["unknown_rate"] == 0
+
+
+def test_shift_and_unknown_categories_are_flagged(training, tmp_path):
+    tables, stats, rows = training
+    shifted = [dict(row, glucose=row["glucose"] + 100, smoking="Vape") for row in rows[:200]]
+    report = observe_all(tmp_path / "state.db", tables, shifted).report(stats)
+    assert "glucose" in report["drifting"]
+    assert "smoking" in report["drifting"]
+    assert "age" not in report["drifting"]
+
+
+def test_merges_from_several_monitors_add_up(training, tmp_path):
+    tables, stats, rows = training
+    path = tmp_path / "state.db"
+    for part in range(3):
+        observe_all(path, tables, rows[part::3]).merge()
+    merged = DriftMonitor(str(path)).report(stats)["features"]["age"]
+    single = observe_all(tmp_path / "single.db", tables, rows).report(stats)["features"]["age"]
+    assert merged["count"] == single["count"]
+    assert merged["mean"] == pytest.approx(single["mean"])
+    assert merged["std"] == pytest.approx(single["std"])
@@ -0,0 +1,69 @@
+"""The compiled forest must score bit-identically to scaler.transform + sklearn predict_proba."""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from fast_forest import compile_forest, load_compiled
+from preprocessing import FEATURE_COLUMNS, FIELD_NAMES, build_encoder_tables, rows_to_features
+
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+ROWS = 2000
+
+
+@pytest.fixture(scope="module")
+def unified():
+    """(model, scaler, encoder tables, compiled forest, encoded dataset rows)."""
+    models = os.path.join(ROOT, "models")
+    model = joblib.load(os.path.join(models, "unified_model.pkl"))
+    scaler = joblib.load(os.path.join(models, "unified_scaler.pkl"))
+    tables = build_encoder_tables(joblib.load(os.path.join(models, "unified_encoders.pkl")))
+    df = pd.read_csv(os.path.join(ROOT, "datasets", "disease_dataset.csv"), keep_default_na=False, nrows=ROWS)
+    X = rows_to_features(tables, df[FEATURE_COLUMNS].rename(columns=dict(zip(FEATURE_COLUMNS, FIELD_NAMES))))
+    return model, scaler, tables, compile_forest(model, scaler), X
+
+
+def assert_bit_identical(engine, model, scaler, X):
+    expected = model.predict_proba(scaler.transform(X))
+    labels, proba = engine.score(X)
+    assert np.array_equal(proba.view(np.uint64), expected.view(np.uint64))
+    assert np.array_equal(labels, model.predict(scaler.transform(X)))
+
+
+def test_dataset_rows(unified):
+    model, scaler, _, engine, X = unified
+    assert_bit_identical(engine, model, scaler, X)
+
+
+def test_threshold_edges(unified):
+    # Each row gets one feature exactly on a folded threshold, then one ulp above it
+    model, scaler, _, engine, X = unified
+    rng = np.random.default_rng(42)
+    picks = rng.choice(np.flatnonzero(np.isfinite(engine.threshold)), size=len(X))
+    rows = np.arange(len(X))
+    on_edge = X.copy()
+    on_edge[rows, engine.feature[picks]] = engine.threshold[picks]
+    above = on_edge.copy()
+    above[rows, engine.feature[picks]] = np.nextafter(engine.threshold[picks], np.inf)
+    assert_bit_identical(engine, model, scaler, np.vstack([on_edge, above]))
+
+
+def test_missing_values(unified):
+    # NaN inputs follow each split's learned missing-value direction
+    model, scaler, _, engine, X = unified
+    missing = X.copy()
+    missing[np.random.default_rng(7).random(X.shape) < 0.2] = np.nan
+    assert_bit_identical(engine, model, scaler, missing)
+
+
+def test_memory_mapped_export(unified, tmp_path):
+    model, scaler, tables, engine, X = unified
+    engine.save(str(tmp_path / "compiled"), tables)
+    mapped, mapped_tables = load_compiled(str(tmp_path / "compiled"))
+    assert isinstance(mapped.threshold, np.memmap)
+    assert mapped_tables == tables
+    assert_bit_identical(mapped, model, scaler, X)
@@ -0,0 +1,40 @@
+"""Dashboard pages after appends must match a registry built from scratch."""
+import random
+
+import pytest
+
+from patient_registry import SORTABLE_COLUMNS, PatientRegistry
+from patient_storage import CsvPatientStorage
+
+COLUMNS = ["Patient ID", "Name", "Age", "Gender", "Blood Group", "Contact", "City/Village", "Medical History"]
+
+
+def make_patients(rng, first, count):
+    return [{
+        "Patient ID": str(first + i),
+        "Name": rng.choice(["Asha", "ravi", "Ravi", "zed", ""]) + str(rng.randint(0, 30)),
+        "Age": rng.choice([str(rng.randint(1, 90)), "", "n/a"]),  # some rows have no numeric key
+        "Gender": rng.choice(["Male", "Female"]),
+        "Blood Group": "O+",
+        "Contact": str(9000000000 + first + i),
+        "City/Village": rng.choice(["Guntur", "guntur", "Vizag", ""]),
+        "Medical History": "",
+    } for i in range(count)]
+
+
+@pytest.mark.parametrize("sort", sorted(SORTABLE_COLUMNS))
+def test_appended_rows_merge_into_cached_order(tmp_path, sort):
+    rng = random.Random(7)
+    storage = CsvPatientStorage(str(tmp_path / "patients.csv"), COLUMNS)
+    storage.append_many(COLUMNS, make_patients(rng, 1000, 500))
+    registry = PatientRegistry(storage)
+    registry.page(sort=sort)
+
+    first = 1500
+    for count in (1, 3, 40):
+        storage.append_many(COLUMNS, make_patients(rng, first, count))
+        first += count
+        fresh = PatientRegistry(storage)
+        for descending in (False, True):
+            assert registry.page(sort=sort, descending=descending, per_page=1000) == \
+                fresh.page(sort=sort, descending=descending, per_page=1000)
@@ -1,59 +1,432 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
+import numpy as np
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import StandardScaler, LabelEncoder
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import joblib
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from fast_forest import compile_forest
+from model_registry import ModelRegistry, load_bundle, MODEL_FILE, SCALER_FILE, ENCODERS_FILE, COMPILED_DIR
+from preprocessing import build_encoder_tables
 
 # Create models directory if not exists
 if not os.path.exists("models"):
     os.makedirs("models")
 
-def train_unified_model():
-    print("Training Unified Disease Model...")
-    try:
-        df = pd.read_csv("datasets/disease_dataset.csv")
-    except FileNotFoundError:
-        print("Dataset not found. Please run generate_comprehensive_data.py first.")
-        return
+# Hyperparameter grid for --search: forest size x depth (None = grow until pure)
+SEARCH_N_ESTIMATORS = [25, 50, 100, 200]
+SEARCH_MAX_DEPTH = [10, 20, None]
+
+# Student grid for --compact: trees x depth x minimum leaf size (pruning)
+COMPACT_N_ESTIMATORS = [10, 25, 50]
+COMPACT_MAX_DEPTH = [6, 8, 12]
+COMPACT_MIN_SAMPLES_LEAF = [1, 5]
+# Jittered copies of the training rows labelled by the current model, added to the distillation set
+COMPACT_AUGMENT = 2
+
+def load_training_data(path="datasets/disease_dataset.csv"):
+    """Encoded feature matrix, labels, fitted encoders and the dataset row count."""
+    df = pd.read_csv(path)
 
     # Features and Target
     # Added: AlcoholIntake, PhysicalActivity, DietQuality, SleepHours
-    X = df[['Age', 'Gender', 'BMI', 'BloodPressure_Systolic', 'BloodPressure_Diastolic', 
-            'Glucose_Fasting_mg_dL', 'Cholesterol_Total_mg_dL', 'Smoking', 
+    X = df[['Age', 'Gender', 'BMI', 'BloodPressure_Systolic', 'BloodPressure_Diastolic',
+            'Glucose_Fasting_mg_dL', 'Cholesterol_Total_mg_dL', 'Smoking',
             'AlcoholIntake', 'PhysicalActivity', 'DietQuality', 'SleepHours',
-            'FamilyHistory']]
+            'FamilyHistory']].copy()
     y = df['TargetLabel']
-    
+
     # Encoders
     encoders = {}
     # New categorical features to encode
     categorical_cols = ['Gender', 'Smoking', 'AlcoholIntake', 'PhysicalActivity', 'DietQuality', 'FamilyHistory']
-    
+
     for col in categorical_cols:
         le = LabelEncoder()
-        X.loc[:, col] = le.fit_transform(X[col])
+        # Whole-column assignment: the text column becomes an integer column
+        X[col] = le.fit_transform(X[col])
         encoders[col] = le
         print(f"Encoded {col}: {dict(zip(le.classes_, le.transform(le.classes_)))}")
-        
+    return X, y, encoders, len(df)
+
+def publish_model(model, scaler, encoders, metadata):
+    """Save artifacts as one new version; running apps pick it up without a restart."""
+    registry = ModelRegistry("models")
+    staging = registry.staging_dir()
+    try:
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+        joblib.dump(encoders, os.path.join(staging, ENCODERS_FILE))
+        # Memory-mappable export for the compiled inference engine
+        compile_forest(model, scaler).save(os.path.join(staging, COMPILED_DIR), build_encoder_tables(encoders))
+        version = registry.publish(staging, metadata)
+    except Exception:
+        registry.discard_staging(staging)
+        raise
+    print(f"Unified Model and Encoders Saved as version {version}.\n")
+    return version
+
+def train_unified_model():
+    print("Training Unified Disease Model...")
+    try:
+        X, y, encoders, n_rows = load_training_data()
+    except FileNotFoundError:
+        print("Dataset not found. Please run generate_comprehensive_data.py first.")
+        return
+
     # Scale features
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
-    
+
     X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-    
+
     model = RandomForestClassifier(n_estimators=100, random_state=42)
     model.fit(X_train, y_train)
-    
-    print(f"Unified Model Accuracy: {accuracy_score(y_test, model.predict(X_test)):.4f}")
-    print("Classification Report:\n", classification_report(y_test, model.predict(X_test)))
-    
-    # Save artifacts
-    joblib.dump(model, "models/unified_model.pkl")
-    joblib.dump(scaler, "models/unified_scaler.pkl")
-    joblib.dump(encoders, "models/unified_encoders.pkl")
-    print("Unified Model and Encoders Saved.\n")
+
+    # Predict the test split once for both the accuracy and the report
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Unified Model Accuracy: {accuracy:.4f}")
+    print("Classification Report:\n", classification_report(y_test, y_pred))
+
+    publish_model(model, scaler, encoders, {"accuracy": round(float(accuracy), 4), "rows": n_rows})
+
+# --- Hyperparameter search (python train_models.py --search) ---
+
+# Training data for pool workers, set once per process by _init_worker
+_worker_data = {}
+
+def _init_worker(X_search, y_search, X_train, y_train, X_test, y_test):
+    _worker_data.update(X_search=X_search, y_search=y_search, X_train=X_train, y_train=y_train,
+                        X_test=X_test, y_test=y_test)
+
+def _cv_fold(params, train_idx, test_idx):
+    """Fit one candidate on one CV fold. Returns its fold accuracy."""
+    X, y = _worker_data['X_search'], _worker_data['y_search']
+    model = RandomForestClassifier(random_state=42, **params)
+    model.fit(X[train_idx], y[train_idx])
+    return accuracy_score(y[test_idx], model.predict(X[test_idx]))
+
+def _final_fit(params, out_dir):
+    """Fit one candidate on the full training split and save it. Returns (path, fit seconds, test accuracy)."""
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=42, **params)
+    model.fit(_worker_data['X_train'], _worker_data['y_train'])
+    fit_seconds = time.perf_counter() - start
+    test_accuracy = accuracy_score(_worker_data['y_test'], model.predict(_worker_data['X_test']))
+    path = os.path.join(out_dir, f"rf_{params['n_estimators']}_{params['max_depth']}.pkl")
+    joblib.dump(model, path)
+    return path, fit_seconds, test_accuracy
+
+def single_row_latency_ms(predict_proba, X, repeats=200):
+    """Median time of one single-row predict_proba call."""
+    rows = X[np.random.default_rng(0).integers(0, len(X), repeats)]
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        predict_proba(row[np.newaxis])
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+def search_unified_model(workers=None, folds=3, search_rows=20000, engine='sklearn',
+                         max_latency_ms=None, max_size_mb=None, publish=True):
+    """Cross-validated search over forest size and depth, fitted in parallel across cores.
+
+    CV runs on at most `search_rows` stratified rows so the search stays fast on
+    large datasets; every candidate is then refit on the full training split
+    and timed. The best CV accuracy within the latency/size budget wins.
+    """
+    print("Searching Unified Disease Model hyperparameters...")
+    wall_start = time.perf_counter()
+    try:
+        X, y, encoders, n_rows = load_training_data()
+    except FileNotFoundError:
+        print("Dataset not found. Please run generate_comprehensive_data.py first.")
+        return None
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    y = y.to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+
+    if len(X_train) > search_rows:
+        X_search, _, y_search, _ = train_test_split(X_train, y_train, train_size=search_rows,
+                                                    stratify=y_train, random_state=42)
+    else:
+        X_search, y_search = X_train, y_train
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X_search, y_search))
+
+    # Largest forests first so the pool is not left waiting on one big fit at the end
+    candidates = [{"n_estimators": n, "max_depth": d} for n in SEARCH_N_ESTIMATORS for d in SEARCH_MAX_DEPTH]
+    candidates.sort(key=lambda p: (-p["n_estimators"], p["max_depth"] is not None))
+
+    workers = workers or os.cpu_count()
+    out_dir = tempfile.mkdtemp(prefix="mediai-search-")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(X_search, y_search, X_train, y_train, X_test, y_test)) as pool:
+            cv_jobs = {(i, f): pool.submit(_cv_fold, params, train_idx, test_idx)
+                       for i, params in enumerate(candidates) for f, (train_idx, test_idx) in enumerate(splits)}
+            final_jobs = [pool.submit(_final_fit, params, out_dir) for params in candidates]
+            results = []
+            for i, params in enumerate(candidates):
+                path, fit_seconds, test_accuracy = final_jobs[i].result()
+                cv_scores = [cv_jobs[(i, f)].result() for f in range(len(splits))]
+                results.append(dict(params, path=path, cv_accuracy=float(np.mean(cv_scores)),
+                                    test_accuracy=float(test_accuracy), fit_seconds=fit_seconds))
+        fit_wall = time.perf_counter() - wall_start
+
+        # Latency measured here, one model at a time, so timings are not skewed by parallel fits
+        for result in results:
+            model = joblib.load(result['path'])
+            result['size_mb'] = os.path.getsize(result['path']) / 1e6
+            result['sklearn_ms'] = single_row_latency_ms(lambda row: model.predict_proba(scaler.transform(row)), X_test)
+            compiled = compile_forest(model, scaler)
+            result['compiled_ms'] = single_row_latency_ms(compiled.predict_proba, X_test)
+            result['compiled_mb'] = compiled.nbytes() / 1e6
+            del model, compiled
+
+        latency_key = 'compiled_ms' if engine == 'compiled' else 'sklearn_ms'
+        size_key = 'compiled_mb' if engine == 'compiled' else 'size_mb'
+        for result in results:
+            result['within_budget'] = ((max_latency_ms is None or result[latency_key] <= max_latency_ms) and
+                                       (max_size_mb is None or result[size_key] <= max_size_mb))
+
+        print(f"\n{len(candidates)} candidates x {folds} folds on {len(X_search)} rows, "
+              f"refit on {len(X_train)} rows, {workers} workers: {fit_wall:.1f}s")
+        print(f"{'trees':>5} {'depth':>5} {'cv acc':>7} {'test acc':>8} {'fit s':>6} {'sklearn ms':>10} "
+              f"{'compiled ms':>11} {'pkl MB':>7} {'compiled MB':>11}  budget")
+        for r in sorted(results, key=lambda r: -r['cv_accuracy']):
+            print(f"{r['n_estimators']:>5} {str(r['max_depth']):>5} {r['cv_accuracy']:>7.4f} {r['test_accuracy']:>8.4f} "
+                  f"{r['fit_seconds']:>6.1f} {r['sklearn_ms']:>10.2f} {r['compiled_ms']:>11.2f} "
+                  f"{r['size_mb']:>7.1f} {r['compiled_mb']:>11.1f}  {'ok' if r['within_budget'] else '-'}")
+
+        eligible = [r for r in results if r['within_budget']]
+        if not eligible:
+            print("No candidate meets the latency/size budget; nothing published.")
+            return None
+        # Best CV accuracy; ties go to the faster model
+        best = max(eligible, key=lambda r: (round(r['cv_accuracy'], 4), -r[latency_key]))
+        print(f"\nSelected n_estimators={best['n_estimators']}, max_depth={best['max_depth']} "
+              f"(cv {best['cv_accuracy']:.4f}, {best[latency_key]:.2f} ms, {best[size_key]:.1f} MB on {engine})")
+        print(f"Total wall time: {time.perf_counter() - wall_start:.1f}s")
+
+        if not publish:
+            return best
+        model = joblib.load(best['path'])
+        print("Classification Report:\n", classification_report(y_test, model.predict(X_test)))
+        metadata = {key: best[key] for key in ('n_estimators', 'max_depth', 'cv_accuracy', 'sklearn_ms', 'compiled_ms', 'size_mb')}
+        metadata.update(accuracy=round(best['test_accuracy'], 4), rows=n_rows)
+        publish_model(model, scaler, encoders, metadata)
+        return best
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+# --- Compact model (python train_models.py --compact) ---
+
+# Resident memory of one artifact, measured in a fresh interpreter: load it and score a batch
+_RSS_PROBE = """
+import sys, numpy as np
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * __import__('os').sysconf('SC_PAGE_SIZE') / 1e6
+from model_registry import load_bundle
+X = np.load(sys.argv[3])
+before = rss_mb()
+bundle = load_bundle(sys.argv[1], 'probe', sys.argv[2])
+bundle.score(X)
+print(rss_mb() - before)
+"""
+
+def resident_mb(directory, engine, X):
+    """RSS growth (MB) of loading an artifact and scoring X, including libraries it imports; None off Linux."""
+    if not os.path.exists("/proc/self/statm"):
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".npy") as f:
+        np.save(f, X)
+        f.flush()
+        out = subprocess.run([sys.executable, "-c", _RSS_PROBE, directory, engine, f.name],
+                             capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(out.stdout.strip().splitlines()[-1])
+
+def directory_mb(paths):
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+    return total / 1e6
+
+def batch_ms_per_1k(predict_proba, X):
+    start = time.perf_counter()
+    predict_proba(X)
+    return (time.perf_counter() - start) * 1000 / len(X) * 1000
+
+def distillation_set(X, categorical_cols, teacher, augment, seed=42):
+    """Training rows plus jittered copies (numeric columns only), with the teacher's probabilities as targets."""
+    rng = np.random.default_rng(seed)
+    categorical = [X.columns.get_loc(col) for col in categorical_cols]
+    base = X.to_numpy(dtype=np.float64)
+    numeric = np.setdiff1d(np.arange(base.shape[1]), categorical)
+    copies = [base]
+    for _ in range(augment):
+        jittered = base.copy()
+        jittered[:, numeric] += rng.normal(0, 0.05, (len(base), len(numeric))) * base[:, numeric].std(axis=0)
+        copies.append(jittered)
+    X_distill = np.vstack(copies)
+    return X_distill, teacher.predict_proba(X_distill)
+
+def compact_unified_model(max_latency_ms=None, max_size_mb=None, publish=True, workers=None):
+    """Distil the serving model into a small forest that meets a latency/size budget.
+
+    Candidates are multi-output regression forests fitted on the current
+    model's class probabilities (training rows plus jittered copies), with
+    limited depth and a minimum leaf size. Each is compiled with node indexes,
+    thresholds and probabilities in the narrowest types, and timed and sized
+    as it would be served. The most accurate candidate within budget is
+    published as a compiled-only version (the app serves it through the
+    compiled engine) after a report against the current model.
+    """
+    print("Building compact Unified Disease Model...")
+    # The current sklearn model is scored on plain arrays below
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    try:
+        X, y, encoders, n_rows = load_training_data()
+    except FileNotFoundError:
+        print("Dataset not found. Please run generate_comprehensive_data.py first.")
+        return None
+
+    registry = ModelRegistry("models")
+    version = registry.active_version()
+    teacher = load_bundle(registry.version_dir(version), version, 'compiled')
+    if teacher is None:
+        print(f"Model version {version} could not be loaded; train a model first.")
+        return None
+    classes = teacher.classes_
+
+    # Same split as train_unified_model, so the current model's test rows are unseen by both
+    X_train, X_test, y_train, y_test = train_test_split(X, y.to_numpy(), test_size=0.2, random_state=42)
+    X_test = X_test.to_numpy(dtype=np.float64)
+    X_distill, soft_targets = distillation_set(X_train, list(encoders), teacher.engine, COMPACT_AUGMENT)
+    teacher_labels = teacher.engine.score(X_test)[0]
+
+    candidates = [{"n_estimators": n, "max_depth": d, "min_samples_leaf": m}
+                  for n in COMPACT_N_ESTIMATORS for d in COMPACT_MAX_DEPTH for m in COMPACT_MIN_SAMPLES_LEAF]
+    results = []
+    out_dir = tempfile.mkdtemp(prefix="mediai-compact-")
+    try:
+        for i, params in enumerate(candidates):
+            student = RandomForestRegressor(random_state=42, n_jobs=workers, **params)
+            student.fit(X_distill, soft_targets)
+            forest = compile_forest(student, classes=classes).compact()
+            path = os.path.join(out_dir, f"candidate_{i}")
+            forest.save(path)
+            labels = forest.score(X_test)[0]
+            results.append(dict(params, forest=forest, path=path,
+                                accuracy=accuracy_score(y_test, labels),
+                                agreement=float(np.mean(labels == teacher_labels)),
+                                single_ms=single_row_latency_ms(forest.predict_proba, X_test),
+                                size_mb=directory_mb([path])))
+            del student
+
+        for r in results:
+            r['within_budget'] = ((max_latency_ms is None or r['single_ms'] <= max_latency_ms) and
+                                  (max_size_mb is None or r['size_mb'] <= max_size_mb))
+        print(f"\n{len(candidates)} candidates distilled from version {version} on {len(X_distill)} rows")
+        print(f"{'trees':>5} {'depth':>5} {'leaf':>4} {'accuracy':>8} {'agree':>6} {'row ms':>7} {'MB':>6}  budget")
+        for r in sorted(results, key=lambda r: -r['accuracy']):
+            print(f"{r['n_estimators']:>5} {r['max_depth']:>5} {r['min_samples_leaf']:>4} {r['accuracy']:>8.4f} "
+                  f"{r['agreement']:>6.3f} {r['single_ms']:>7.3f} {r['size_mb']:>6.2f}  {'ok' if r['within_budget'] else '-'}")
+
+        eligible = [r for r in results if r['within_budget']]
+        if not eligible:
+            print("No candidate meets the latency/size budget; nothing published.")
+            return None
+        # Most accurate; ties go to the smaller artifact
+        best = max(eligible, key=lambda r: (round(r['accuracy'], 3), -r['size_mb']))
+
+        report = compact_report(registry, version, teacher, best, X_test, y_test)
+        if not publish:
+            return report
+        forest = best['forest']
+        scaler = StandardScaler().fit(X)  # kept with the version for its training statistics
+        staging = registry.staging_dir()
+        try:
+            forest.save(os.path.join(staging, COMPILED_DIR), build_encoder_tables(encoders))
+            joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+            joblib.dump(encoders, os.path.join(staging, ENCODERS_FILE))
+            metadata = {key: best[key] for key in ('n_estimators', 'max_depth', 'min_samples_leaf')}
+            metadata.update(artifact="compact", distilled_from=version, rows=n_rows,
+                            accuracy=round(best['accuracy'], 4), report=report)
+            published = registry.publish(staging, metadata)
+        except Exception:
+            registry.discard_staging(staging)
+            raise
+        print(f"Compact model published as version {published}.\n")
+        return report
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+def compact_report(registry, version, teacher, best, X_test, y_test):
+    """Print and return accuracy, size on disk, resident memory and latency: current model vs compact."""
+    directory = registry.version_dir(version)
+    rows = []
+    model_path = os.path.join(directory, MODEL_FILE)
+    if os.path.exists(model_path):
+        current = load_bundle(directory, version, 'sklearn')
+        rows.append(("current, sklearn", accuracy_score(y_test, current.score(X_test)[0]),
+                     directory_mb([model_path, os.path.join(directory, SCALER_FILE), os.path.join(directory, ENCODERS_FILE)]),
+                     resident_mb(directory, 'sklearn', X_test),
+                     single_row_latency_ms(lambda row: current.score(row), X_test),
+                     batch_ms_per_1k(current.score, X_test)))
+    rows.append(("current, compiled", accuracy_score(y_test, teacher.engine.score(X_test)[0]),
+                 directory_mb([os.path.join(directory, COMPILED_DIR)]), resident_mb(directory, 'compiled', X_test),
+                 single_row_latency_ms(teacher.engine.predict_proba, X_test),
+                 batch_ms_per_1k(teacher.engine.predict_proba, X_test)))
+    compact_dir = os.path.dirname(best['path'])
+    os.replace(best['path'], os.path.join(compact_dir, COMPILED_DIR))
+    best['path'] = os.path.join(compact_dir, COMPILED_DIR)
+    rows.append((f"compact {best['n_estimators']}x{best['max_depth']}/{best['min_samples_leaf']}", best['accuracy'], best['size_mb'],
+                 resident_mb(compact_dir, 'compiled', X_test),
+                 single_row_latency_ms(best['forest'].predict_proba, X_test),
+                 batch_ms_per_1k(best['forest'].predict_proba, X_test)))
+
+    print(f"\n{'model':<20} {'accuracy':>8} {'disk MB':>8} {'RSS MB':>7} {'row ms':>7} {'ms/1k rows':>10}")
+    for name, accuracy, disk, rss, single, batch in rows:
+        rss_text = f"{rss:>7.1f}" if rss is not None else f"{'n/a':>7}"
+        print(f"{name:<20} {accuracy:>8.4f} {disk:>8.2f} {rss_text} {single:>7.3f} {batch:>10.2f}")
+    print("RSS: growth from loading the artifact and scoring the test rows in a fresh process, imports included.")
+    return [dict(zip(["model", "accuracy", "disk_mb", "rss_mb", "single_row_ms", "batch_ms_per_1k"],
+                     [name] + [round(v, 4) if v is not None else None for v in values]))
+            for name, *values in rows]
 
 if __name__ == "__main__":
-    train_unified_model()
+    parser = argparse.ArgumentParser(description="Train the unified disease model and publish it as a new version.")
+    parser.add_argument("--search", action="store_true", help="cross-validated search over forest size and depth")
+    parser.add_argument("--compact", action="store_true", help="distil the current model into a small forest within budget")
+    parser.add_argument("--workers", type=int, default=None, help="processes for --search (default: all cores)")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--search-rows", type=int, default=20000, help="rows used for cross-validation")
+    parser.add_argument("--engine", choices=["sklearn", "compiled"], default="sklearn", help="engine the budget applies to")
+    parser.add_argument("--max-latency-ms", type=float, default=None, help="single-row latency budget")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="model artifact size budget")
+    parser.add_argument("--dry-run", action="store_true", help="report the search / compact model without publishing")
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_unified_model(args.max_latency_ms, args.max_size_mb, publish=not args.dry_run, workers=args.workers)
+    elif args.search:
+        search_unified_model(args.workers, args.folds, args.search_rows, args.engine,
+                             args.max_latency_ms, args.max_size_mb, publish=not args.dry_run)
+    else:
+        train_unified_model()
@@ -1,6 +1,13 @@
 import pandas as pd
 import os
 import hashlib
+import bulk_io
+from history_store import HistoryStore, normalize_patient_id, EXPORT_COLUMNS
+from patient_registry import PatientRegistry
+from patient_storage import open_patient_storage, file_lock
+from doctor_directory import DoctorDirectory
+from id_allocator import IdAllocator, PATIENT_COUNTER, FIRST_PATIENT_ID
+from metrics import timed
 
 # File paths
 DATA_DIR = "data"
@@ -19,18 +26,74 @@ if not os.path.exists(USERS_FILE):
         "name": ["Administrator"]
     }).to_csv(USERS_FILE, index=False)
 
+PATIENT_COLUMNS = ["Patient ID", "Name", "Age", "Gender", "Blood Group", "Contact", "City/Village", "Medical History"]
+
+# Patients storage backend: 'csv' (default, data/patients.csv) or 'parquet'
+# (data/patients.parquet/, needs pyarrow; created from patients.csv on first use)
+PATIENT_STORAGE = os.environ.get('MEDIAI_PATIENT_STORAGE', 'csv')
+PATIENTS_PARQUET = os.path.join(DATA_DIR, "patients.parquet")
+
 # Initialize Patients File
-if not os.path.exists(PATIENTS_FILE):
-    pd.DataFrame(columns=[
-        "Patient ID", "Name", "Age", "Gender", "Blood Group", "Contact", "City/Village", "Medical History"
-    ]).to_csv(PATIENTS_FILE, index=False)
+patient_storage = open_patient_storage(PATIENT_STORAGE, PATIENTS_FILE, PATIENTS_PARQUET, PATIENT_COLUMNS)
+
+# Parsed patients table, reloaded only when the stored table changes
+patient_registry = PatientRegistry(patient_storage)
+
+# Small SQLite database for shared app state (e.g. the patient ID counter)
+STATE_DB = os.path.join(DATA_DIR, "state.db")
+_id_allocator = None
+
+def _get_id_allocator():
+    global _id_allocator
+    if _id_allocator is None:
+        _id_allocator = IdAllocator(STATE_DB)
+        # Start after the highest existing numeric ID (only used the first time)
+        ids = pd.to_numeric(load_patients(columns=['Patient ID'])['Patient ID'], errors='coerce')
+        last_used = max(int(ids.max()) if ids.notna().any() else 0, FIRST_PATIENT_ID - 1)
+        _id_allocator.seed(PATIENT_COUNTER, last_used)
+    return _id_allocator
 
+@timed("id_allocate")
+def allocate_patient_id():
+    """Hand out a new, never-used Patient ID."""
+    return allocate_patient_ids(1)[0]
+
+def allocate_patient_ids(count):
+    """Hand out `count` new, never-used Patient IDs, reserved as consecutive blocks."""
+    ids = []
+    while len(ids) < count:
+        needed = count - len(ids)
+        first = _get_id_allocator().allocate(PATIENT_COUNTER, needed)
+        # Guard against IDs added to patients.csv by hand
+        ids.extend(str(i) for i in range(first, first + needed) if patient_registry.get(str(i)) is None)
+    return ids
+
+# Prediction history lives in SQLite; history.csv is only read once for migration
 HISTORY_FILE = os.path.join(DATA_DIR, "history.csv")
-if not os.path.exists(HISTORY_FILE):
-    pd.DataFrame(columns=[
-        "Patient ID", "Disease", "Risk Score", "Date", "Inputs"
-    ]).to_csv(HISTORY_FILE, index=False)
+HISTORY_DB = os.path.join(DATA_DIR, "history.db")
+_history_store = None
+
+def get_history_store():
+    """Open the history store, migrating history.csv on first use."""
+    global _history_store
+    if _history_store is None:
+        _history_store = HistoryStore(HISTORY_DB)
+        migrated = _history_store.migrate_csv(HISTORY_FILE)
+        if migrated:
+            print(f"Migrated {migrated} history records from {HISTORY_FILE}.")
+        if not _history_store.structured_migrated():
+            updated = _history_store.migrate_structured(_patient_profiles())
+            print(f"Parsed structured inputs of {updated} history records.")
+    return _history_store
 
+def _patient_profiles():
+    """Patient ID -> (city, gender), for history rows saved without them."""
+    df = load_patients()
+    city = df['City/Village'] if 'City/Village' in df.columns else df.get('Address', pd.Series("", index=df.index))
+    gender = df['Gender'] if 'Gender' in df.columns else pd.Series("", index=df.index)
+    return {normalize_patient_id(pid): (c or None, g or None) for pid, c, g in zip(df['Patient ID'], city, gender)}
+
+@timed("admin_login")
 def login_user(username, password):
     """Simple authentication function for Admins."""
     users = pd.read_csv(USERS_FILE)
@@ -43,127 +106,142 @@ def login_user(username, password):
         return user.iloc[0]['name']
     return None
 
+@timed("patient_login")
 def login_patient(identifier, contact):
     """Authentication for Patients using Name/ID and Contact Number."""
-    df = get_patients()
-    if df.empty:
-        return None
-        
-    # Convert to string for safe comparison
-    df['Patient ID'] = df['Patient ID'].astype(str)
-    df['Name'] = df['Name'].astype(str)
-    df['Contact'] = df['Contact'].astype(str)
-    
-    # Check if identifier matches Name OR ID, AND Contact matches
-    # Case insensitive search for name
-    patient = df[
-        ((df['Patient ID'] == identifier) | (df['Name'].str.lower() == identifier.lower())) & 
-        (df['Contact'] == contact)
-    ]
-    
-    if not patient.empty:
-        return patient.iloc[0].to_dict()
-    return None
+    # Identifier matches ID or Name (case insensitive), AND Contact matches
+    return patient_registry.login(identifier, contact)
 
 from datetime import datetime
 
-def save_prediction(patient_id, disease, risk_score, inputs=None):
-    """Save a prediction result to history."""
-    if not os.path.exists(HISTORY_FILE):
-        # Create with Inputs column if not exists
-        pd.DataFrame(columns=[
-            "Patient ID", "Disease", "Risk Score", "Date", "Inputs"
-        ]).to_csv(HISTORY_FILE, index=False)
-        
-    history = pd.read_csv(HISTORY_FILE)
-    
-    # Ensure Inputs column exists (for backward compatibility)
-    if 'Inputs' not in history.columns:
-        history['Inputs'] = ""
-        
-    new_record = pd.DataFrame([{
-        "Patient ID": str(patient_id),
-        "Disease": disease,
-        "Risk Score": risk_score,
-        "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Inputs": str(inputs) if inputs else ""
-    }])
-    history = pd.concat([history, new_record], ignore_index=True)
-    history.to_csv(HISTORY_FILE, index=False)
+@timed("history_append")
+def save_prediction(patient_id, disease, risk_score, inputs=None, model_version=None, features=None):
+    """Save a prediction result to history, with the model version and the typed model inputs (form field -> value)."""
+    patient = patient_registry.get(patient_id) or {}
+    get_history_store().append(
+        patient_id,
+        disease,
+        risk_score,
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        str(inputs) if inputs else "",
+        model_version,
+        city=patient.get('City/Village', patient.get('Address')),
+        features=features
+    )
     return True
 
+@timed("history_read")
 def get_patient_history(patient_id):
     """Retrieve history for a specific patient."""
-    if not os.path.exists(HISTORY_FILE):
-        return []
-        
-    df = pd.read_csv(HISTORY_FILE)
-    df = df.fillna("") # Handle NaNs
-    # Filter by Patient ID
-    patient_history = df[df['Patient ID'].astype(str) == str(patient_id)]
-    return patient_history.to_dict('records')
+    return get_history_store().get_patient_history(patient_id)
+
+@timed("history_read")
+def get_patient_history_page(patient_id, page, per_page):
+    """One page of a patient's history, newest first, and the patient's total record count."""
+    return get_history_store().get_patient_history_page(patient_id, page, per_page)
+
+@timed("history_analytics")
+def get_disease_distribution():
+    """Predicted diseases by city, age band and gender, from counts kept up to date on every save."""
+    return get_history_store().disease_distribution()
+
+@timed("history_summary")
+def get_patient_history_summary(patient_id):
+    """Latest prediction, count per disease and recent risk trend, kept up to date by save_prediction."""
+    return get_history_store().get_summary(patient_id)
 
 def get_patients():
     """Load all patients."""
-    if os.path.exists(PATIENTS_FILE):
-        df = pd.read_csv(PATIENTS_FILE)
-        return df.fillna("") # Handle NaN values to prevent display issues
-    return pd.DataFrame()
+    return patient_registry.dataframe()
 
+@timed("patient_write")
 def add_patient(patient_data):
-    """Add a new patient to the CSV."""
-    df = get_patients()
-    new_patient = pd.DataFrame([patient_data])
-    df = pd.concat([df, new_patient], ignore_index=True)
-    df.to_csv(PATIENTS_FILE, index=False)
+    """Add a new patient to the patients table."""
+    with file_lock(patient_storage.path):
+        columns = patient_registry.columns()
+        if columns and set(patient_data) <= set(columns):
+            patient_storage.append(columns, patient_data)
+            patient_registry.invalidate()
+            return True
+            
+        # New columns: fall back to rewriting the table with the extended header
+        df = get_patients()
+        new_patient = pd.DataFrame([patient_data])
+        df = pd.concat([df, new_patient], ignore_index=True)
+        patient_storage.rewrite(df)
+        patient_registry.invalidate(full=True)
     return True
 
+def add_patients(records):
+    """Add many patients (dicts with the existing columns) in one write."""
+    with file_lock(patient_storage.path):
+        patient_storage.append_many(patient_registry.columns() or PATIENT_COLUMNS, records)
+        patient_registry.invalidate()
+    return True
+
+@timed("patient_import")
+def import_patients(source):
+    """Bulk-add the patients in a CSV (path or file object); returns the import report (see bulk_io.py)."""
+    return bulk_io.import_patients(source, patient_registry, allocate_patient_ids, add_patients)
+
+# Tables offered by export_table
+EXPORT_TABLES = ["patients", "history"]
+
+def export_table(table, fmt="csv"):
+    """Generator of CSV or JSON text for the whole patients or history table."""
+    if table == "patients":
+        columns = patient_registry.columns() or PATIENT_COLUMNS
+        return bulk_io.export_text(columns, bulk_io.patient_chunks(patient_storage, columns), fmt)
+    if table == "history":
+        return bulk_io.export_text(EXPORT_COLUMNS, get_history_store().iter_records(bulk_io.EXPORT_CHUNK_ROWS), fmt)
+    raise ValueError(f"Unknown table: {table}")
+
+def load_patients(columns=None, filters=None):
+    """Read patients straight from storage: only `columns`, rows matching (column, op, value) `filters`."""
+    return patient_storage.read(columns, filters)
+
+@timed("patient_page")
+def get_patients_page(search="", gender="", city="", sort="Patient ID", descending=False, page=1, per_page=25):
+    """One filtered, sorted page of patients. Returns (records, matching count)."""
+    return patient_registry.page(search, gender, city, sort, descending, page, per_page)
+
+def get_patient_summary():
+    """Dashboard counters (total, by gender, by city), maintained as patients are added."""
+    return patient_registry.summary()
+
+@timed("patient_lookup")
 def get_patient_by_id(patient_id):
     """Retrieve patient details by ID."""
-    df = get_patients()
-    if df.empty:
-        return None
-        
-    # Ensure robust comparison by converting both to string and stripping whitespace
-    # Handle case where ID might be float (e.g. 1800.0) from CSV read
-    df['Patient ID'] = df['Patient ID'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-    search_id = str(patient_id).strip().replace('.0', '')
-    
-    patient = df[df['Patient ID'] == search_id]
-    
-    if not patient.empty:
-        return patient.iloc[0].to_dict() # Ensure dict return
+    return patient_registry.get(patient_id)
+
 DOCTOR_FILE = os.path.join(DATA_DIR, "../datasets/doctor_dataset.csv")
 
+# Parsed doctor dataset with search indexes, reloaded only when the file changes
+doctor_directory = DoctorDirectory(DOCTOR_FILE)
+
 def get_doctor_search_options():
     """Get unique cities and specializations for the dropdowns."""
     if not os.path.exists(DOCTOR_FILE):
         return [], []
-        
-    try:
-        df = pd.read_csv(DOCTOR_FILE, encoding='utf-8') # Handle potential encoding issues
-    except UnicodeDecodeError:
-        df = pd.read_csv(DOCTOR_FILE, encoding='latin1')
-        
-    cities = sorted(df['Hospital Location'].dropna().unique().tolist())
-    specializations = sorted(df['Doctor Specialization'].dropna().unique().tolist())
-    return cities, specializations
+    return doctor_directory.options()
 
-def search_doctors(city=None, specialization=None):
-    """Search doctors by city and specialization."""
+@timed("doctor_search")
+def search_doctors(city=None, specialization=None, page=1, per_page=20):
+    """One page of doctors by city and specialization, best ranked first. Returns (doctors, total)."""
     if not os.path.exists(DOCTOR_FILE):
-        return []
+        return [], 0
         
-    try:
-        df = pd.read_csv(DOCTOR_FILE, encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv(DOCTOR_FILE, encoding='latin1')
-    
-    # Filter
-    if city and city != 'Select City':
-        df = df[df['Hospital Location'] == city]
-        
-    if specialization and specialization != 'Select Specialization':
-        df = df[df['Doctor Specialization'] == specialization]
+    # Placeholder dropdown values mean "no filter"
+    if city == 'Select City':
+        city = None
+    if specialization == 'Select Specialization':
+        specialization = None
         
-    return df.to_dict('records')
+    return doctor_directory.search(city, specialization, page, per_page)
+
+@timed("doctor_recommend")
+def recommend_doctors(disease, city=None):
+    """(specialization, top doctors, in_city) for a predicted disease, near `city` when possible."""
+    if not os.path.exists(DOCTOR_FILE):
+        return None, [], False
+    return doctor_directory.recommend(disease, city)